@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import data_processing as dp
+import explore_data
+
+words = pa.Table.from_pandas(explore_data.words_df[dp.WORD_COLUMNS], preserve_index=False)
+exploded = dp.explode_syllables(words)
+stats = dp.ambiguity_table(dp.syllable_counts(exploded))
+
+# (pronunciation, spelling) -> row of `stats`; a spelling's readings are the same rows seen from the other side
+pair_rows = {pair: i for i, pair in enumerate(zip(stats['Pronunciation'], stats['Syllables']))}
+STAT_COLUMNS = ['Count', 'Frequency', 'Spelling Share', 'Spelling Rank', 'Spellings',
+                'Reading Share', 'Reading Rank', 'Readings']
+stat_arrays = {name: stats[name].to_numpy() for name in STAT_COLUMNS}
+
+
+def pair_stats(pronunciation, spelling):
+    """Statistics of one syllable pairing as a dict, or None if it never occurs."""
+    i = pair_rows.get((pronunciation, spelling))
+    if i is None: return None
+    return {name: values[i].item() for name, values in stat_arrays.items()}
+
+
+def spelling_stats(pronunciation, spelling):
+    """How `pronunciation` is spelt: (share, rank, number of spellings) of `spelling` among them."""
+    s = pair_stats(pronunciation, spelling)
+    return (s['Spelling Share'], s['Spelling Rank'], s['Spellings']) if s else None
+
+
+def reading_stats(spelling, pronunciation):
+    """How `spelling` is read: (share, rank, number of readings) of `pronunciation` among them."""
+    s = pair_stats(pronunciation, spelling)
+    return (s['Reading Share'], s['Reading Rank'], s['Readings']) if s else None
+
+
+def syllable_ambiguity(syllables, pronunciation, mode="Spelling"):
+    """[(syllable, pronunciation, share, rank, alternatives), ...] for one word, in syllable order."""
+    lookup = spelling_stats if mode == "Spelling" else (lambda p, s: reading_stats(s, p))
+    result = []
+    for syl, pron in zip(syllables, pronunciation):
+        s = lookup(pron, syl)
+        result.append((syl, pron) + (s if s else (float('nan'), 0, 0)))
+    return result
+
+
+def build_word_scores(words, exploded):
+    """
+    Vocabulary-wide scores per word: the weakest share and worst rank over its syllables, in both
+    modes. Words whose syllables and pronunciation don't line up get NaN / 0.
+    """
+    rows = exploded['Row'].to_numpy()
+    pair_idx = np.array([pair_rows[p] for p in zip(exploded['Pronunciation'].to_pylist(),
+                                                   exploded['Syllables'].to_pylist())], dtype=np.int64)
+    scores = pd.DataFrame({'Word': words['Word'].to_pylist(), 'Frequency': words['Frequency'].to_numpy()})
+    for mode in ("Spelling", "Reading"):
+        share = np.full(len(scores), np.inf)
+        rank = np.zeros(len(scores), dtype=np.int64)
+        np.minimum.at(share, rows, stat_arrays[f"{mode} Share"][pair_idx])
+        np.maximum.at(rank, rows, stat_arrays[f"{mode} Rank"][pair_idx])
+        scores[f"Weakest {mode} Share"] = np.where(np.isinf(share), np.nan, share)
+        scores[f"Worst {mode} Rank"] = rank
+    return scores.sort_values('Frequency', ascending=False, kind='stable', ignore_index=True)
+
+
+word_scores = build_word_scores(words, exploded)
+
+
+def table_view(view="Syllables", mode="Spelling", share_range=(0, 1), query="", limit=500):
+    """
+    Rows of the syllable statistics or the word scores with the mode's share inside `share_range`,
+    optionally restricted to an exact pronunciation / spelling / word, most frequent first.
+    """
+    if view == "Words":
+        table, share = word_scores, word_scores[f"Weakest {mode} Share"].to_numpy()
+        keys = (word_scores['Word'].to_numpy(),)
+    else:
+        table, share = stats, stat_arrays[f"{mode} Share"]
+        keys = (stats['Pronunciation'].to_numpy(), stats['Syllables'].to_numpy())
+    mask = (share >= share_range[0]) & (share <= share_range[1])
+    query = query.strip().upper()
+    if query:
+        mask &= np.logical_or.reduce([k == query for k in keys])
+    return table.iloc[np.flatnonzero(mask)[:limit]]
+
+
+if __name__ == "__main__":
+    print(stats.head(10).to_string())
+    print(spelling_stats('AY', 'I'), reading_stats('I', 'AY'))
+    row = words.filter(pc.equal(words['Word'], 'ACCOMMODATE')).to_pylist()[0]
+    print(syllable_ambiguity(row['Syllables'], row['Pronunciation']))
+    print(table_view("Words", "Spelling", (0, 0.01)).head().to_string())
@@ -1,34 +1,32 @@
 from shiny import App, ui, render, reactive
-from shinywidgets import output_widget, render_plotly
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
-import numpy as np
 import os
 import sys
-import pickle
+import random
 import text as txt
 
 
 # Ensure local modules can be imported
 sys.path.append(os.path.dirname(__file__))
 
-import spelling_bee_map
-from ngram import fetch_ngram_data
-
 
 # -----------------------------------------------------------------------------
 # 1. DATA LOADING
+# plotly, shinywidgets, pandas and the data modules (explore_data, spelling_bee_map,
+# error_analysis, sound_search, ambiguity_stats, phoneme_query) are imported by the handlers that use
+# them, so a worker starts serving straight away and each dataset loads on first use.
 # -----------------------------------------------------------------------------
-#print("Loading data...")
-words_df = pd.read_parquet("lexarchDataProcessing/word_dataset_with_difficulties.parquet")
-search_df = pd.read_parquet("lexarchDataProcessing/search.parquet").dropna()
-with open("lexarchDataProcessing/frequency_ratios_data.pkl","rb") as f:
-    frequency_ratios = pickle.load(f)
-ALL_WORDS = words_df['Word'].tolist()
-parts_df = pd.read_parquet("lexarchDataProcessing/parts_database.parquet")
+def warm_up():
+    """
+    Imports every deferred module and loads its data now. Run it before workers are forked
+    (e.g. gunicorn --preload with LEXARCH_PRELOAD=1) so they share the loaded state.
+    """
+    import plotly.express, plotly.graph_objects, shinywidgets
+    import explore_data, ambiguity_stats, spelling_bee_map, error_analysis, sound_search, phoneme_query, ngram
+    import compound_index
+    compound_index.vocabulary_index()
+
 
-#print("Done")
+if os.environ.get("LEXARCH_PRELOAD"): warm_up()
 
 
 # -----------------------------------------------------------------------------
@@ -60,6 +58,7 @@ app_ui = ui.page_navbar(
             ui.sidebar(
                 ui.h4("Examination Setup", style="margin-bottom: 20px; font-style:italic;"),
                 ui.input_numeric("num_words", "Word Count", value=1, min=1, max=10),
+                ui.input_numeric("exam_code", "Exam Code (optional)", value=None, min=0),
                 ui.input_action_button("btn_step1", "Initialize Inputs", class_="btn-secondary", width="100%"),
                 ui.hr(style="border-color:#dcd6cc"),
                 ui.output_ui("ui_step2_inputs"), 
@@ -73,6 +72,51 @@ app_ui = ui.page_navbar(
             )
         )
     ),
+    ui.nav_panel("Sound Search",
+        ui.layout_sidebar(
+            ui.sidebar(
+                ui.h4("Spell From Sound", style="margin-bottom: 20px; font-style:italic;"),
+                ui.input_text("sound_query", "Phonemes", placeholder="AH | K AA | M AH | D EY T"),
+                ui.br(),
+                ui.input_action_button("btn_sound", "Find Spellings", class_="btn-primary", width="100%")
+            ),
+            ui.card(
+                ui.card_header("Candidate Spellings"),
+                ui.output_ui("sound_results")
+            )
+        )
+    ),
+    ui.nav_panel("Pattern Search",
+        ui.layout_sidebar(
+            ui.sidebar(
+                ui.h4("Phoneme Patterns", style="margin-bottom: 20px; font-style:italic;"),
+                ui.input_text("pattern_query", "Pronunciation Pattern", placeholder="K * <V> T"),
+                ui.input_text("pattern_spelling", "Only Spellings", placeholder="*IGH*, *EI*"),
+                ui.input_text("pattern_exclude", "Exclude Spellings", placeholder="I"),
+                ui.p("? = one phoneme, * = any run, <V> / <C> = vowel / consonant, EY|AY = either.", style="color:#595959; font-size:0.8em; font-style:italic;"),
+                ui.input_action_button("btn_pattern", "Search Patterns", class_="btn-primary", width="100%")
+            ),
+            ui.card(
+                ui.card_header("Spellings Of Matching Syllables"),
+                ui.output_ui("pattern_results")
+            )
+        )
+    ),
+    ui.nav_panel("Ambiguity Table",
+        ui.layout_sidebar(
+            ui.sidebar(
+                ui.h4("Ambiguity Statistics", style="margin-bottom: 20px; font-style:italic;"),
+                ui.input_radio_buttons("amb_view", "Table", choices=["Syllables", "Words"], selected="Syllables"),
+                ui.input_radio_buttons("amb_mode", "Analysis Mode", choices=["Spelling", "Reading"], selected="Spelling"),
+                ui.input_slider("amb_share", "Share Among Alternatives", min=0, max=1, value=[0, 1], step=0.01),
+                ui.input_text("amb_query", "Pronunciation, Spelling or Word", placeholder="AY"),
+            ),
+            ui.card(
+                ui.card_header("Most Frequent Matches (sortable)"),
+                ui.output_data_frame("ambiguity_table")
+            )
+        )
+    ),
     title=ui.span("LEXARCH", style="font-family:'Playfair Display'; letter-spacing: 0.1em; font-weight:900;")
 )
 
@@ -80,23 +124,29 @@ app_ui = ui.page_navbar(
 # 3. SERVER LOGIC
 # -----------------------------------------------------------------------------
 def server(input, output, session):
+    # Deferred imports (see warm_up): the first session pays for these, later ones reuse them
+    from shinywidgets import output_widget, render_plotly
+    import plotly.graph_objects as go
+    import plotly.express as px
+    import numpy as np
+    import explore_data
     
     # Initialize Search Dropdown
-    ui.update_selectize("explore_word", choices=ALL_WORDS, server=True)
+    ui.update_selectize("explore_word", choices=explore_data.ALL_WORDS, server=True)
     search_triggered = reactive.Value(False)
     
     # --- CALCULATIONS ---
     @reactive.Calc
     def get_word_data():
         w = input.explore_word().strip().upper()
-        if search_df.empty or words_df.empty: return None
-        row = words_df[words_df['Word'] == w]
-        return row.iloc[0] if not row.empty else None
+        if explore_data.search_df.empty or explore_data.words_df.empty: return None
+        return explore_data.word_row(w)
 
     @reactive.Calc
     @reactive.event(input.btn_explore)
     def get_ngram_data():
         w = input.explore_word().strip().upper()
+        from ngram import fetch_ngram_data
         return fetch_ngram_data(w) if w else []
 
     @reactive.Effect
@@ -176,6 +226,17 @@ def server(input, output, session):
         for c1, c2 in zip(chips_ui1, chips_ui2):
             chips_ui.extend([c1, c2, " "])
 
+        # Per-syllable share and rank among the alternatives, from the precomputed statistics
+        import ambiguity_stats
+        amb_rows = []
+        for syl, pron, share, rank, n_alt in ambiguity_stats.syllable_ambiguity(data['Syllables'], data['Pronunciation'], "Spelling" if mode == "Spelling" else "Reading"):
+            amb_rows.append(ui.tags.tr(
+                ui.tags.td(syl if mode == "Spelling" else pron, style="color:#1a1a1a; border-color:#dcd6cc; font-weight:bold;"),
+                ui.tags.td(pron if mode == "Spelling" else syl, style="color:#595959; border-color:#dcd6cc;"),
+                ui.tags.td(f"{share:.0%}" if n_alt else "—", style="color:#1a1a1a; border-color:#dcd6cc; font-family:'Courier New';"),
+                ui.tags.td(f"#{rank} of {n_alt}" if n_alt else "", style="color:#595959; border-color:#dcd6cc; font-style:italic;")
+            ))
+
         return ui.div(
             ui.h3(w, style="font-size: 3.5rem; color:#1a1a1a !important; text-decoration: underline; text-decoration-color: #dcd6cc;"),
             compound,
@@ -186,13 +247,15 @@ def server(input, output, session):
                 ui.span(f"{diff_val:.2f}", style="color:#1a1a1a; font-size:1.4em; font-weight:bold; font-family:'Georgia', serif;")
             ),
             ui.h6(f"{mode.upper()} BREAKDOWN:", style="margin-top: 25px; color: #595959 !important; font-style:italic;"),
-            ui.div(chips_ui)
+            ui.div(chips_ui),
+            ui.h6("SYLLABLE AMBIGUITY:", style="margin-top: 25px; color: #595959 !important; font-style:italic;"),
+            ui.tags.table(ui.tags.tbody(*amb_rows), class_="table table-sm", style="color:#1a1a1a; border-color:#dcd6cc;")
         )
 
     # --- PLOTS ---
     @render_plotly
     def pie_plot():
-        ratios = frequency_ratios
+        ratios = explore_data.frequency_ratios
         if not ratios: return px.pie(title="No Data")
         
         counts = {
@@ -213,7 +276,7 @@ def server(input, output, session):
 
     @render_plotly
     def relevance_plot():
-        ratios = frequency_ratios
+        ratios = explore_data.frequency_ratios
         if not ratios: return go.Figure().update_layout(title="No Data")
         
         data = np.array([x for x in ratios if x > 0])
@@ -247,20 +310,9 @@ def server(input, output, session):
         # Get parent and child lists
         p_list, c_list = data[parent_col], data[child_col]
 
-        df_parents = [
-            search_df[search_df[parent_col] == p].nlargest(100, 'Frequency') for p in p_list
-        ]
-        df_parent = pd.concat(df_parents, ignore_index=True)
+        df_parent = explore_data.ambiguity_frame(data, mode)
         if df_parent.empty: return px.treemap(title="Ambiguity data not available for this word, please try another.")
 
-        # Compute colors for children
-        df_parent["Ambiguity"] = df_parent.apply(
-        lambda row: 1 if (row[parent_col], row[child_col]) in zip(p_list, c_list) else 0,
-        axis=1
-        )
-
-        # Create a label for children that shows the word itself
-        df_parent["label"] = df_parent[child_col]
         subtitle = "  ".join([f"{p} ({c})" for p,c in zip(p_list, c_list)])
         #print("Prepared data...")
 
@@ -303,20 +355,11 @@ def server(input, output, session):
     def similar_treemap():
         w = input.explore_word().strip().upper()
         data = get_word_data()
-        if data is None or parts_df.empty: return None
-        
-        target_signatures = [f"{s} ({p})" for s, p in zip(data['Syllables'], data['Pronunciation'])]
-        matched_df = parts_df[parts_df['Signature'].isin(target_signatures)].copy()
-        matched_df = matched_df[matched_df['Word'] != w]
+        if data is None or explore_data.parts_df.empty: return None
         
+        matched_df = explore_data.similar_words_frame(w, data)
         if matched_df.empty: return px.treemap(title="No similar words found.")
 
-        df_signatures = [
-            matched_df[matched_df['Signature'] == sig].nlargest(100, 'Frequency')
-            for sig in matched_df['Signature'].unique()
-        ]
-        matched_df = pd.concat(df_signatures, ignore_index=True)
-
         fig = px.treemap(matched_df, path=['Signature', 'Word'], values='Show', color='Difficulty', color_continuous_scale='RdYlGn_r', range_color=[0, 1])
         fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(color='#1a1a1a', family="Lora, serif"), margin=dict(t=0, l=0, r=0, b=0))
         return fig
@@ -338,6 +381,52 @@ def server(input, output, session):
         )
         return fig
 
+    # --- SOUND SEARCH ---
+    @render.ui
+    @reactive.event(input.btn_sound)
+    def sound_results():
+        import sound_search
+        candidates = sound_search.spell_from_sound(input.sound_query())
+        if not candidates: return ui.p("No spelling found for these phonemes.", style="font-style:italic; color:#666;")
+        rows = []
+        for spelling, prob, known in candidates:
+            color = "#2e7d32" if known else "#595959"
+            rows.append(ui.tags.tr(
+                ui.tags.td(spelling, style=f"color:{color}; border-color:#dcd6cc; font-weight:bold; font-family:'Courier New';"),
+                ui.tags.td(f"{prob:.3f}", style="color:#1a1a1a; border-color:#dcd6cc;"),
+                ui.tags.td("VERIFIED ENTRY" if known else "", style="color:#2e7d32; border-color:#dcd6cc; font-size:0.7em; letter-spacing:1px;")
+            ))
+        return ui.tags.table(ui.tags.tbody(*rows), class_="table", style="color:#1a1a1a; border-color:#dcd6cc;")
+
+    # --- PATTERN SEARCH ---
+    @render.ui
+    @reactive.event(input.btn_pattern)
+    def pattern_results():
+        import phoneme_query
+        split = lambda text: [t for t in text.replace(",", " ").split() if t]
+        try:
+            res = phoneme_query.query(input.pattern_query(), split(input.pattern_spelling()), split(input.pattern_exclude()))
+        except ValueError as e:
+            return ui.p(str(e), style="font-style:italic; color:#c62828;")
+        if res.empty: return ui.p("No syllables match this pattern.", style="font-style:italic; color:#666;")
+        rows = []
+        for r in res.head(100).itertuples(index=False):
+            rows.append(ui.tags.tr(
+                ui.tags.td(r.Spelling, style="color:#1a1a1a; border-color:#dcd6cc; font-weight:bold; font-family:'Courier New';"),
+                ui.tags.td(r.Pronunciations, style="color:#595959; border-color:#dcd6cc;"),
+                ui.tags.td(f"{r.Share:.1%}", style="color:#1a1a1a; border-color:#dcd6cc;"),
+                ui.tags.td(f"{r.Words} words", style="color:#595959; border-color:#dcd6cc;"),
+                ui.tags.td(r.Examples, style="color:#595959; border-color:#dcd6cc; font-style:italic;")
+            ))
+        return ui.tags.table(ui.tags.tbody(*rows), class_="table", style="color:#1a1a1a; border-color:#dcd6cc;")
+
+    # --- AMBIGUITY TABLE ---
+    @render.data_frame
+    def ambiguity_table():
+        import ambiguity_stats
+        table = ambiguity_stats.table_view(input.amb_view(), input.amb_mode(), input.amb_share(), input.amb_query())
+        return render.DataGrid(table.round(4), filters=True, width="100%")
+
     # --- GAME LOGIC ---
     game_state = reactive.Value("IDLE") 
     game_rounds = reactive.Value([])
@@ -345,6 +434,7 @@ def server(input, output, session):
     round_scores = reactive.Value([])
     words_data_store = reactive.Value({}) 
     word_syllable_map = reactive.Value({}) 
+    exam_code = reactive.Value(None)
     user_inputs = reactive.Value({})
 
     @render.ui
@@ -357,7 +447,7 @@ def server(input, output, session):
     @reactive.event(input.btn_step1)
     def update_test_inputs():
         n = input.num_words()
-        for i in range(n): ui.update_selectize(f"word_input_{i}", choices=ALL_WORDS, server=True)
+        for i in range(n): ui.update_selectize(f"word_input_{i}", choices=explore_data.ALL_WORDS, server=True)
 
     @render.ui
     @reactive.event(input.btn_step1)
@@ -380,10 +470,9 @@ def server(input, output, session):
             except AttributeError: continue
             
             w_clean = str(w_val).strip().upper()
-            row = words_df[words_df['Word'] == w_clean]
-            if row.empty: continue
+            data = explore_data.word_row(w_clean)
+            if data is None: continue
             
-            data = row.iloc[0]
             valid_words_data[w_clean] = {'Syllables': data['Syllables'], 'Pronunciation': data['Pronunciation']}
             choices = {str(idx): f"{syl} ({pron})" for idx, (syl, pron) in enumerate(zip(data['Syllables'], data['Pronunciation']))}
             
@@ -409,7 +498,7 @@ def server(input, output, session):
     @reactive.Effect
     @reactive.event(input.btn_generate_game)
     def start_game_logic():
-        if spelling_bee_map is None: return
+        import spelling_bee_map
         valid_data = words_data_store.get()
         n = input.num_words()
         tested_words = []
@@ -434,12 +523,20 @@ def server(input, output, session):
             ui.notification_show("Select at least one syllable.", type="warning")
             return
         
+        # The same code, words and syllables always give the same exam, e.g. for a whole class.
+        # Only entered codes go through the template cache; one-off exams would just evict them.
+        code = input.exam_code()
+        
         try:
-            saved_dicts, _, all_words_res = spelling_bee_map.generate_test_words(tested_words, 0.05, 0.10)
+            if code is None:
+                code = random.randrange(1000000)
+                saved_dicts, _, all_words_res = spelling_bee_map.generate_test_words(tested_words, 0.05, 0.10, code)
+                rounds = spelling_bee_map.organize_rounds(all_words_res, code)
+            else:
+                saved_dicts, rounds = spelling_bee_map.exam_template(tested_words, 0.05, 0.10, int(code))
             mapping = {}
             for gen_word, reason in saved_dicts.items():
                 label = reason[0] if isinstance(reason, list) and reason else "Unknown"
-                if isinstance(reason, set): label = list(reason)[0]
                 mapping[gen_word] = label
             
             for item in tested_words:
@@ -447,7 +544,7 @@ def server(input, output, session):
                     if syl_map: mapping[orig_word] = list(syl_map.keys())[0]
 
             word_syllable_map.set(mapping)
-            rounds = spelling_bee_map.organize_rounds(all_words_res)
+            exam_code.set(int(code))
             game_rounds.set(rounds)
             current_round_idx.set(0)
             round_scores.set([])
@@ -468,6 +565,7 @@ def server(input, output, session):
             current_words = rounds[idx]
             
             inputs = [ui.h4(f"ROUND {idx + 1} / {len(rounds)}", style="letter-spacing:2px; color:#1a1a1a;")]
+            inputs.append(ui.p(f"EXAM CODE {exam_code.get()}", style="color:#595959; font-size:0.7em; letter-spacing:1px; font-family:'Courier New';"))
             inputs.append(ui.p("Listen and spell:", style="color:#666; font-style:italic;"))
             
             for i, word in enumerate(current_words):
@@ -490,7 +588,8 @@ def server(input, output, session):
                 rows.append(ui.tags.tr(
                     ui.tags.td(word, style="color:#1a1a1a; border-color:#dcd6cc; font-weight:bold;"),
                     ui.tags.td(data['guess'], style=f"color:{color}; border-color:#dcd6cc; font-family:'Courier New';"),
-                    ui.tags.td("✓" if data['correct'] else "✗", style="color:#1a1a1a; border-color:#dcd6cc;")
+                    ui.tags.td("✓" if data['correct'] else "✗", style="color:#1a1a1a; border-color:#dcd6cc;"),
+                    ui.tags.td("" if data['correct'] else data.get('error', ""), style="color:#595959; border-color:#dcd6cc; font-style:italic;")
                 ))
             tbl = ui.tags.table(ui.tags.tbody(*rows), class_="table", style="color:#1a1a1a; border-color:#dcd6cc;")
             btn_txt = "NEXT ROUND" if idx < len(rounds)-1 else "VIEW RESULTS"
@@ -575,6 +674,11 @@ def server(input, output, session):
             is_correct = (val_clean == word)
             if is_correct: correct += 1
             current_guesses[word] = {'guess': val_clean, 'correct': is_correct}
+
+        import error_analysis
+        errors = error_analysis.classify_round({w: d['guess'] for w, d in current_guesses.items()}, explore_data.word_row)
+        for word, (label, _) in errors.items():
+            current_guesses[word]['error'] = label
         
         all_inputs = user_inputs.get()
         all_inputs[idx] = current_guesses
@@ -0,0 +1,56 @@
+import functools
+
+
+def build_compound_index(words_df):
+    """
+    Builds both directions of the compound relation from the `Compound` list column:
+    {component: compounds containing it, most frequent first} and {compound: components}.
+    Single-part entries (the word itself) are not compounds and are left out.
+    """
+    compounds = words_df[words_df['Compound'].map(len) > 1]
+    components_of = {w: tuple(parts) for w, parts in zip(compounds['Word'], compounds['Compound'])}
+
+    pairs = compounds[['Word', 'Compound', 'Frequency']].explode('Compound')
+    pairs = pairs.sort_values('Frequency', ascending=False, kind='stable').drop_duplicates(['Compound', 'Word'])
+    compounds_of = {part: tuple(group) for part, group in pairs.groupby('Compound', sort=False)['Word']}
+    return compounds_of, components_of
+
+
+@functools.cache
+def vocabulary_index():
+    """The compound index of explore_data.words_df, built on first use."""
+    import explore_data
+    return build_compound_index(explore_data.words_df)
+
+
+def compounds_containing(word, index=None):
+    """All compounds with `word` as a component, most frequent first."""
+    return (index or vocabulary_index())[0].get(word, ())
+
+
+def components(word, index=None):
+    """Components of a compound word, or () if it is not one."""
+    return (index or vocabulary_index())[1].get(word, ())
+
+
+def compound_relatives(word, index=None):
+    """
+    Words related to `word` through compounding, as (shared part, word) pairs:
+    its components, compounds built on it, and compounds sharing one of its components.
+    `index` is a build_compound_index result, the loaded vocabulary's by default.
+    """
+    index = index or vocabulary_index()
+    related = {}
+    for part in components(word, index):
+        if part != word: related.setdefault(part, part)
+    for compound in compounds_containing(word, index):
+        related.setdefault(compound, word)
+    for part in components(word, index):
+        for compound in compounds_containing(part, index):
+            if compound != word: related.setdefault(compound, part)
+    return [(part, w) for w, part in related.items()]
+
+
+if __name__ == "__main__":
+    for test_word in ["ACCEPTABLE", "ACCEPT", "ABOVEBOARD"]:
+        print(test_word, components(test_word), compounds_containing(test_word)[:5], compound_relatives(test_word)[:5])
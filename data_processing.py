@@ -1,7 +1,14 @@
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pickle
 import ast
 import os
 
+DATA_DIR = "lexarchDataProcessing"
+
 def load_word_data(filename="lexarchDataProcessing/word_dataset_with_difficulties.parquet"):
     # Look in current folder OR data/ folder
     if not os.path.exists(filename):
@@ -19,4 +26,244 @@ def load_search_csv(filename="lexarchDataProcessing/search.parquet"):
         return pd.DataFrame() # Return empty if missing
 
     df = pd.read_parquet(filename)
-    return df
\ No newline at end of file
+    return df
+
+
+# -----------------------------------------------------------------------------
+# DIFFICULTY PIPELINE
+# Spelling Difficulty = 1 - mean over syllables of P(spelling | pronunciation)
+# Reading Difficulty  = 1 - mean over syllables of P(pronunciation | spelling)
+# Frequencies are summed per (Pronunciation, Syllables) pair, so the counts table
+# can be built chunk by chunk and patched when a slice of the corpus changes.
+# -----------------------------------------------------------------------------
+WORD_COLUMNS = ['Word', 'Compound', 'Pronunciation', 'Syllables', 'Frequency']
+PAIR_KEYS = ['Pronunciation', 'Syllables']
+
+
+def _as_table(words):
+    if isinstance(words, pd.DataFrame):
+        return pa.Table.from_pandas(words, preserve_index=False)
+    return words
+
+
+def explode_syllables(words):
+    """One row per (word, pronunciation, syllable); `Row` points back at the word's row, `Position` is the syllable index."""
+    words = _as_table(words)
+    aligned = pc.equal(pc.list_value_length(words['Syllables']), pc.list_value_length(words['Pronunciation']))
+    row_ids = pa.array(np.arange(len(words)))
+    words = words.append_column('Row', row_ids).filter(aligned)
+
+    parents = pc.list_parent_indices(words['Syllables'])
+    parent_ids = parents.to_numpy()
+    idx = np.arange(len(parent_ids))
+    starts = np.r_[True, parent_ids[1:] != parent_ids[:-1]] if len(idx) else np.zeros(0, dtype=bool)
+    position = idx - np.maximum.accumulate(np.where(starts, idx, 0)) if len(idx) else idx
+    return pa.table({
+        'Row': pc.take(words['Row'], parents),
+        'Position': pa.array(position),
+        'Word': pc.take(words['Word'], parents),
+        'Pronunciation': pc.list_flatten(words['Pronunciation']),
+        'Syllables': pc.list_flatten(words['Syllables']),
+        'Frequency': pc.take(words['Frequency'], parents),
+    })
+
+
+def syllable_counts(exploded):
+    """Frequency total and word count for each (Pronunciation, Syllables) pair."""
+    counts = exploded.group_by(PAIR_KEYS).aggregate([('Frequency', 'sum'), ('Word', 'count')])
+    return counts.rename_columns({'Frequency_sum': 'Frequency', 'Word_count': 'Count'})
+
+
+def merge_counts(*counts):
+    """Adds together counts tables built from separate chunks of the corpus."""
+    merged = pa.concat_tables(counts).group_by(PAIR_KEYS).aggregate([('Frequency', 'sum'), ('Count', 'sum')])
+    merged = merged.rename_columns({'Frequency_sum': 'Frequency', 'Count_sum': 'Count'})
+    return merged.filter(pc.greater(merged['Count'], 0))
+
+
+def syllable_shares(exploded, counts):
+    """Attaches P(spelling | pronunciation) and P(pronunciation | spelling) to every exploded row."""
+    pron_totals = counts.group_by('Pronunciation').aggregate([('Frequency', 'sum')]) \
+        .rename_columns({'Frequency_sum': 'Pronunciation Total'})
+    syl_totals = counts.group_by('Syllables').aggregate([('Frequency', 'sum')]) \
+        .rename_columns({'Frequency_sum': 'Syllables Total'})
+    pairs = counts.select(PAIR_KEYS + ['Frequency']).rename_columns({'Frequency': 'Pair Frequency'})
+
+    joined = exploded.join(pairs, PAIR_KEYS).join(pron_totals, 'Pronunciation').join(syl_totals, 'Syllables')
+    pair_freq = joined['Pair Frequency'].to_numpy().astype(np.float64)
+    joined = joined.append_column('Spelling Share', pa.array(pair_freq / joined['Pronunciation Total'].to_numpy()))
+    return joined.append_column('Reading Share', pa.array(pair_freq / joined['Syllables Total'].to_numpy()))
+
+
+def word_difficulties(words, counts):
+    """Returns `words` with 'Spelling Difficulty' and 'Reading Difficulty' recomputed from `counts`."""
+    words = _as_table(words)
+    shares = syllable_shares(explode_syllables(words), counts)
+    rows = shares['Row'].to_numpy()
+    n_syllables = np.bincount(rows, minlength=len(words))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        spelling = 1 - np.bincount(rows, weights=shares['Spelling Share'].to_numpy(), minlength=len(words)) / n_syllables
+        reading = 1 - np.bincount(rows, weights=shares['Reading Share'].to_numpy(), minlength=len(words)) / n_syllables
+
+    for name in ('Spelling Difficulty', 'Reading Difficulty'):
+        if name in words.column_names:
+            words = words.drop_columns([name])
+    words = words.append_column('Spelling Difficulty', pa.array(spelling))
+    return words.append_column('Reading Difficulty', pa.array(reading))
+
+
+def iter_word_chunks(filename=f"{DATA_DIR}/final_dataset.parquet", batch_size=20000):
+    """Streams the word corpus in record batches so the whole file never has to be in memory."""
+    for batch in pq.ParquetFile(filename).iter_batches(batch_size=batch_size, columns=WORD_COLUMNS):
+        yield pa.Table.from_batches([batch])
+
+
+def build_counts(filename=f"{DATA_DIR}/final_dataset.parquet", batch_size=20000):
+    """First pass: per-pair frequency totals, accumulated chunk by chunk."""
+    return merge_counts(*(syllable_counts(explode_syllables(chunk)) for chunk in iter_word_chunks(filename, batch_size)))
+
+
+def build_word_dataset(filename=f"{DATA_DIR}/final_dataset.parquet",
+                       output=f"{DATA_DIR}/word_dataset_with_difficulties.parquet", batch_size=20000):
+    """Two streaming passes over the corpus: count pairs, then score and write each chunk."""
+    counts = build_counts(filename, batch_size)
+    writer = None
+    for chunk in iter_word_chunks(filename, batch_size):
+        scored = word_difficulties(chunk, counts)
+        if writer is None:
+            writer = pq.ParquetWriter(output, scored.schema)
+        writer.write_table(scored)
+    if writer is not None:
+        writer.close()
+    return counts
+
+
+def update_counts(counts, old_slice=None, new_slice=None):
+    """Removes the contribution of `old_slice` and adds `new_slice` without recounting the corpus."""
+    parts = [counts]
+    if old_slice is not None and len(old_slice):
+        removed = syllable_counts(explode_syllables(old_slice))
+        parts.append(removed.set_column(2, 'Frequency', pc.negate(removed['Frequency']))
+                            .set_column(3, 'Count', pc.negate(removed['Count'])))
+    if new_slice is not None and len(new_slice):
+        parts.append(syllable_counts(explode_syllables(new_slice)))
+    return merge_counts(*parts)
+
+
+def update_word_dataset(words_df, counts, old_slice=None, new_slice=None):
+    """
+    Applies a changed corpus slice: rows of `old_slice` are replaced by `new_slice`, the counts
+    are patched, and only words sharing a pronunciation or spelling with the slice are rescored.
+    Returns (words_df, counts).
+    """
+    old_slice = old_slice if old_slice is not None else words_df.iloc[:0]
+    new_slice = new_slice if new_slice is not None else words_df.iloc[:0]
+    counts = update_counts(counts, old_slice, new_slice)
+
+    changed = pd.concat([old_slice, new_slice])[['Pronunciation', 'Syllables']]
+    changed_prons = pa.array(changed['Pronunciation'].explode().dropna().unique())
+    changed_syls = pa.array(changed['Syllables'].explode().dropna().unique())
+
+    words_df = pd.concat([words_df[~words_df['Word'].isin(old_slice['Word'])], new_slice[WORD_COLUMNS]],
+                         ignore_index=True)
+    exploded = explode_syllables(words_df[WORD_COLUMNS])
+    touched = pc.or_(pc.is_in(exploded['Pronunciation'], changed_prons), pc.is_in(exploded['Syllables'], changed_syls))
+    affected = np.unique(exploded.filter(touched)['Row'].to_numpy())
+
+    rescored = word_difficulties(words_df.iloc[affected][WORD_COLUMNS], counts)
+    for name in ('Spelling Difficulty', 'Reading Difficulty'):
+        words_df.loc[words_df.index[affected], name] = rescored[name].to_numpy()
+    return words_df, counts
+
+
+def ambiguity_table(counts):
+    """
+    Per-pair ambiguity statistics: word count, frequency, the pair's share of its pronunciation
+    (Spelling Share) and of its spelling (Reading Share), and the rank of the pair among those
+    alternatives (1 = most frequent) out of Spellings / Readings alternatives.
+    """
+    stats = counts.select(PAIR_KEYS + ['Count', 'Frequency']).to_pandas()
+    freq = stats['Frequency'].astype(np.float64)
+    for share, rank, n, key in (('Spelling Share', 'Spelling Rank', 'Spellings', 'Pronunciation'),
+                                ('Reading Share', 'Reading Rank', 'Readings', 'Syllables')):
+        groups = freq.groupby(stats[key])
+        stats[share] = freq / groups.transform('sum')
+        stats[rank] = groups.rank(method='min', ascending=False).astype(np.int64)
+        stats[n] = groups.transform('size').astype(np.int64)
+    return stats.sort_values('Frequency', ascending=False, kind='stable', ignore_index=True)
+
+
+def build_search_table(exploded):
+    """
+    Rebuilds search.parquet: one row per (pronunciation, spelling, word), with a word's frequency
+    summed when the pair occurs in it twice. Rows are ordered like the shipped file: pronunciations
+    by first appearance, then spellings by first appearance, then words in corpus order, so a
+    rebuild with unchanged data rewrites an identical file.
+    """
+    keys = ['Pronunciation', 'Syllables', 'Word']
+    rows = exploded.select(keys + ['Frequency']).to_pandas()
+    search = rows.groupby(keys, sort=False)['Frequency'].sum().reset_index()
+    pron_order = pd.factorize(search['Pronunciation'])[0]
+    pair_order = pd.factorize(pd.MultiIndex.from_frame(search[['Pronunciation', 'Syllables']]))[0]
+    search = search.take(np.lexsort((np.arange(len(search)), pair_order, pron_order))).reset_index(drop=True)
+    search['Show'] = np.log(10 * search['Frequency'] + 1)
+    return search
+
+
+def build_parts_database(words):
+    """Rebuilds parts_database.parquet: one row per word syllable, keyed by 'SYL (PRON)' signature."""
+    words = _as_table(words)
+    exploded = explode_syllables(words)
+    difficulty = pc.take(words['Spelling Difficulty'], exploded['Row'])
+    signature = pc.binary_join_element_wise(exploded['Syllables'], ' (', exploded['Pronunciation'], ')', '')
+    return pd.DataFrame({
+        'Word': exploded['Word'].to_numpy(zero_copy_only=False),
+        'Signature': signature.to_numpy(zero_copy_only=False),
+        'Difficulty': difficulty.to_numpy(),
+        'Frequency': exploded['Frequency'].to_numpy(),
+        'Show': 1,
+    })
+
+
+def frequency_ratios(pairs, counts):
+    """
+    Rebuilds frequency_ratios_data.pkl: for each misspelt syllable in spelling_pairs_with_syllables,
+    how often its pronunciation is spelt the wrong way relative to the right way.
+    """
+    pairs = _as_table(pairs)
+    true_syl = pc.list_flatten(pairs['True_syllables'])
+    fake_syl = pc.list_flatten(pairs['Fake_syllables'])
+    exploded = pa.table({
+        'Order': pa.array(np.arange(len(true_syl))),
+        'Pronunciation': pc.list_flatten(pairs['Pronunciation']),
+        'Syllables': true_syl,
+        'Fake': fake_syl,
+    }).filter(pc.not_equal(true_syl, fake_syl))
+
+    freq = counts.select(PAIR_KEYS + ['Frequency'])
+    joined = exploded.join(freq.rename_columns({'Frequency': 'True Frequency'}), PAIR_KEYS) \
+        .join(freq.rename_columns({'Syllables': 'Fake', 'Frequency': 'Fake Frequency'}), ['Pronunciation', 'Fake']) \
+        .sort_by('Order')
+    true_freq = pc.fill_null(joined['True Frequency'], 0).to_numpy()
+    fake_freq = pc.fill_null(joined['Fake Frequency'], 0).to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratios = np.where(true_freq > 0, fake_freq / true_freq, 0)
+    return [r.item() if r else 0 for r in ratios]
+
+
+if __name__ == "__main__":
+    counts = build_word_dataset()
+    words = pq.read_table(f"{DATA_DIR}/word_dataset_with_difficulties.parquet")
+
+    build_search_table(explode_syllables(words)).to_parquet(f"{DATA_DIR}/search.parquet", index=False)
+
+    parts = build_parts_database(words)
+    shipped = pd.read_parquet(f"{DATA_DIR}/parts_database.parquet")
+    drift = np.abs(parts['Difficulty'].to_numpy() - shipped['Difficulty'].to_numpy()).max() if len(parts) == len(shipped) else None
+    print(f"Rebuilt {len(words)} words, {len(counts)} syllable pairs (max drift vs shipped parts database: {drift})")
+    parts.to_parquet(f"{DATA_DIR}/parts_database.parquet", index=False)
+
+    pairs = pd.read_parquet(f"{DATA_DIR}/spelling_pairs_with_syllables.parquet")
+    with open(f"{DATA_DIR}/frequency_ratios_data.pkl", "wb") as f:
+        pickle.dump(frequency_ratios(pairs, counts), f)
@@ -0,0 +1,164 @@
+import pickle
+from functools import lru_cache
+
+import pandas as pd
+
+TYPO = "Typo"
+AMBIGUOUS = "Ambiguous"
+RULE_VIOLATION = "Rule violation"
+CORRECT = "Correct"
+UNCLASSIFIED = "Unclassified"
+
+# Known misspellings: each (true, fake) syllable pair in incorrect_syllables_pairs.pkl lines up
+# with the differing syllables of spelling_pairs_with_syllables, in row order.
+pairs_df = pd.read_parquet("lexarchDataProcessing/spelling_pairs_with_syllables.parquet")
+with open("lexarchDataProcessing/incorrect_syllables_pairs.pkl", "rb") as f:
+    incorrect_pairs = pickle.load(f)
+with open("lexarchDataProcessing/frequency_ratios_data.pkl", "rb") as f:
+    frequency_ratios = pickle.load(f)
+
+# Words whose syllables and pronunciation do not line up one to one
+incorrect_rows = set(pd.read_parquet("lexarchDataProcessing/incorrect_rows.parquet")['Word'])
+
+# (pronunciation, spelling) -> total frequency, used for pairs never seen in the error corpus
+spelling_freq = (
+    pd.read_parquet("lexarchDataProcessing/search.parquet", columns=['Pronunciation', 'Syllables', 'Frequency'])
+    .groupby(['Pronunciation', 'Syllables'])['Frequency'].sum()
+    .to_dict()
+)
+
+
+def build_error_index(pairs_df, frequency_ratios):
+    """Builds the {(pronunciation, true syllable, fake syllable): frequency ratio} hash index."""
+    exploded = pairs_df[['Pronunciation', 'True_syllables', 'Fake_syllables']].explode(
+        ['Pronunciation', 'True_syllables', 'Fake_syllables']
+    )
+    exploded = exploded[exploded['True_syllables'] != exploded['Fake_syllables']]
+    keys = zip(exploded['Pronunciation'], exploded['True_syllables'], exploded['Fake_syllables'])
+    return dict(zip(keys, frequency_ratios))
+
+
+error_index = build_error_index(pairs_df, frequency_ratios)
+
+
+def frequency_ratio(pron, true_syl, fake_syl):
+    """How often `pron` is spelt `fake_syl` relative to `true_syl` (0 if never)."""
+    key = (pron, true_syl, fake_syl)
+    if key in error_index:
+        return error_index[key]
+    true_freq = spelling_freq.get((pron, true_syl), 0)
+    if not true_freq:
+        return 0
+    return spelling_freq.get((pron, fake_syl), 0) / true_freq
+
+
+def align(guess, target, band=2):
+    """
+    Banded edit-distance alignment of `guess` against `target`.
+    Returns cuts where guess[cuts[i]:cuts[i+1]] is what was typed for target[i].
+    """
+    n, m = len(target), len(guess)
+    band = max(band, abs(n - m))
+    inf = n + m + 1
+    dist = [[inf] * (m + 1) for _ in range(n + 1)]
+    for j in range(min(m, band) + 1):
+        dist[0][j] = j
+    for i in range(1, n + 1):
+        lo, hi = max(0, i - band), min(m, i + band)
+        row, prev = dist[i], dist[i - 1]
+        if lo == 0:
+            row[0] = i
+        for j in range(max(1, lo), hi + 1):
+            cost = prev[j - 1] + (target[i - 1] != guess[j - 1])
+            if prev[j] + 1 < cost: cost = prev[j] + 1
+            if row[j - 1] + 1 < cost: cost = row[j - 1] + 1
+            row[j] = cost
+
+    # Walk back from the end, keeping the lowest guess position reached on each target row
+    # so that inserted letters on a syllable boundary go to the following syllable.
+    cuts = [0] * (n + 1)
+    cuts[n] = m
+    i, j = n, m
+    while i > 0:
+        if j > 0 and dist[i][j] == dist[i - 1][j - 1] + (target[i - 1] != guess[j - 1]):
+            i, j = i - 1, j - 1
+        elif dist[i][j] == dist[i - 1][j] + 1:
+            i -= 1
+        else:
+            j -= 1
+        if i < n: cuts[i] = j
+    cuts[0] = 0
+    return cuts
+
+
+def split_guess(guess, syllables):
+    """Splits a guess into the parts typed for each of the target's syllables."""
+    cuts = align(guess, "".join(syllables))
+    parts, pos = [], 0
+    for syl in syllables:
+        parts.append(guess[cuts[pos]:cuts[pos + len(syl)]])
+        pos += len(syl)
+    return parts
+
+
+def classify_syllable(pron, true_syl, fake_syl):
+    ratio = frequency_ratio(pron, true_syl, fake_syl)
+    if ratio <= 0: return TYPO, ratio
+    # The correct spelling was the more common one: using the 'rule' would have avoided the error
+    if ratio < 1: return RULE_VIOLATION, ratio
+    return AMBIGUOUS, ratio
+
+
+@lru_cache(maxsize=4096)
+def _classify(guess, word, syllables, pronunciation):
+    if guess == word:
+        return CORRECT, ()
+    if not guess or word in incorrect_rows or len(syllables) != len(pronunciation):
+        return UNCLASSIFIED, ()
+
+    errors = []
+    for pron, true_syl, fake_syl in zip(pronunciation, syllables, split_guess(guess, syllables)):
+        if true_syl == fake_syl: continue
+        label, ratio = classify_syllable(pron, true_syl, fake_syl)
+        errors.append((pron, true_syl, fake_syl, label, ratio))
+
+    labels = {e[3] for e in errors}
+    for label in (AMBIGUOUS, RULE_VIOLATION, TYPO):
+        if label in labels:
+            return label, tuple(errors)
+    return TYPO, tuple(errors)
+
+
+def classify_guess(guess, word, syllables, pronunciation):
+    """
+    Classifies a guess for `word` as Correct, Typo, Ambiguous or Rule violation.
+    Returns (label, [(pronunciation, true syllable, guessed syllable, label, ratio), ...]).
+    """
+    label, errors = _classify(str(guess).strip().upper(), word, tuple(syllables), tuple(pronunciation))
+    return label, list(errors)
+
+
+def classify_round(guesses, word_row):
+    """
+    Classifies a whole round of {word: guess}. `word_row(word)` returns the word's row (with
+    Syllables and Pronunciation) or None, e.g. explore_data.word_row, an O(1) lookup.
+    """
+    results = {}
+    for word, guess in guesses.items():
+        row = word_row(word)
+        if row is None:
+            results[word] = (UNCLASSIFIED, [])
+            continue
+        results[word] = classify_guess(guess, word, row['Syllables'], row['Pronunciation'])
+    return results
+
+
+if __name__ == "__main__":
+    import time
+    import explore_data
+    test_round = {"ABSORPTION": "ABSORBTION", "ACCOMMODATE": "ACCOMODATE", "AMATEUR": "AMATURE", "ARCTIC": "ARTIC", "ANCHOR": ""}
+    start = time.perf_counter()
+    results = classify_round(test_round, explore_data.word_row)
+    print(f"Round classified in {(time.perf_counter() - start) * 1000:.2f} ms")
+    for word, (label, errors) in results.items():
+        print(f"{word} -> {test_round[word]}: {label} {errors}")
@@ -0,0 +1,55 @@
+import pickle
+
+import pandas as pd
+
+import compound_index
+from lookup_index import GroupIndex, row_lookup
+
+words_df = pd.read_parquet("lexarchDataProcessing/word_dataset_with_difficulties.parquet")
+search_df = pd.read_parquet("lexarchDataProcessing/search.parquet")
+if search_df.isna().any(axis=None): search_df = search_df.dropna()
+with open("lexarchDataProcessing/frequency_ratios_data.pkl","rb") as f:
+    frequency_ratios = pickle.load(f)
+ALL_WORDS = words_df['Word'].tolist()
+parts_df = pd.read_parquet("lexarchDataProcessing/parts_database.parquet")
+
+# Precomputed row indexes: requests slice these instead of filtering whole frames
+WORD_ROWS = row_lookup(words_df, 'Word')
+search_by = {col: GroupIndex(search_df, col) for col in ("Pronunciation", "Syllables")}
+parts_by_signature = GroupIndex(parts_df, 'Signature', columns=['Word'])
+parts_by_word = GroupIndex(parts_df, 'Word')
+
+
+def word_row(w):
+    """The words_df row for `w`, or None."""
+    pos = WORD_ROWS.get(w)
+    return words_df.iloc[pos] if pos is not None else None
+
+
+def ambiguity_frame(data, mode):
+    """Top alternatives for each of the word's syllables, flagged 1 where they are the word's own pairing."""
+    child_col = "Syllables" if mode == "Spelling" else "Pronunciation"
+    parent_col = "Pronunciation" if mode == "Spelling" else "Syllables"
+    p_list, c_list = data[parent_col], data[child_col]
+
+    df_parent = search_by[parent_col].top(p_list, 100).reset_index(drop=True)
+    own_pairs = set(zip(p_list, c_list))
+    df_parent["Ambiguity"] = [int(pair in own_pairs) for pair in zip(df_parent[parent_col], df_parent[child_col])]
+    df_parent["label"] = df_parent[child_col]
+    return df_parent
+
+
+def similar_words_frame(w, data):
+    """Most frequent other words for each of the word's signatures, plus its compound relatives."""
+    target_signatures = [f"{s} ({p})" for s, p in zip(data['Syllables'], data['Pronunciation'])]
+    signatures = [sig for sig in dict.fromkeys(target_signatures) if sig in parts_by_signature]
+    matched_df = parts_by_signature.top(signatures, 100, exclude=('Word', w)).reset_index(drop=True)
+
+    # Words sharing a part with this one through compounding
+    relatives = compound_index.compound_relatives(w)[:100]
+    relatives = [(part, r) for part, r in relatives if r in parts_by_word]
+    if relatives:
+        compound_df = parts_by_word.top([r for _, r in relatives], 1)[['Word', 'Difficulty', 'Frequency', 'Show']]
+        compound_df = compound_df.assign(Signature=["COMPOUND: " + part for part, _ in relatives])
+        matched_df = pd.concat([matched_df, compound_df], ignore_index=True)
+    return matched_df
@@ -0,0 +1,140 @@
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import compound_index
+import data_processing as dp
+
+WORDS_FILE = "lexarchDataProcessing/word_dataset_with_difficulties.parquet"
+PARTS_FILE = "lexarchDataProcessing/parts_database.parquet"
+WORD_FIELDS = ['Word', 'Compound', 'Pronunciation', 'Syllables', 'Frequency', 'Spelling Difficulty', 'Reading Difficulty']
+
+
+def similar_words_table(parts_df, max_similar=10):
+    """
+    Long (Signature, Similar, Rank) table: the most frequent words sharing each syllable-pronunciation
+    signature, as in the similar words treemap. One spare row per signature lets the word itself be dropped.
+    """
+    top = parts_df.sort_values('Frequency', ascending=False, kind='stable').groupby('Signature').head(max_similar + 1)
+    top = top.assign(Rank=top.groupby('Signature').cumcount())
+    schema = pa.schema([('Signature', pa.string()), ('Similar', pa.string()), ('Rank', pa.int64())])
+    return pa.Table.from_pandas(top[['Signature', 'Word', 'Rank']].rename(columns={'Word': 'Similar'}),
+                                schema=schema, preserve_index=False)
+
+
+def load_sources(words_file=WORDS_FILE, parts_file=PARTS_FILE, max_similar=10):
+    """Loads everything the export joins against once; its size does not depend on the input list."""
+    words = pq.read_table(words_file, columns=WORD_FIELDS)
+    counts = dp.syllable_counts(dp.explode_syllables(words))
+    similar = similar_words_table(pd.read_parquet(parts_file, columns=['Word', 'Signature', 'Frequency']), max_similar)
+    compounds = compound_index.build_compound_index(words.select(['Word', 'Compound', 'Frequency']).to_pandas())
+    return words, counts, similar, compounds
+
+
+def analyse_words(word_list, words, counts, similar, compounds, max_similar=10, unmatched=None):
+    """
+    Explore-mode analysis of `word_list` as one row per (word, syllable): difficulties,
+    the share of each syllable's spelling/pronunciation among its alternatives (the treeplot
+    ambiguity), the compound parts (null for non-compounds) and, as in the similar words treemap,
+    the most frequent words with the same signature and the word's compound relatives.
+    Words not in the vocabulary, or whose syllables and pronunciation don't line up, have no
+    rows; they are appended to `unmatched` when it is given.
+    """
+    request = pa.array([str(w).strip().upper() for w in word_list], pa.string())
+    positions = pc.index_in(request, value_set=words['Word'])
+    selected = words.take(pc.drop_null(positions))
+    if unmatched is not None:
+        matched = positions.is_valid().to_numpy(zero_copy_only=False)
+        matched[matched] = pc.equal(pc.list_value_length(selected['Syllables']),
+                                    pc.list_value_length(selected['Pronunciation'])).to_numpy(zero_copy_only=False)
+        unmatched.extend(request.filter(pa.array(~matched)).to_pylist())
+
+    shares = dp.syllable_shares(dp.explode_syllables(selected), counts)
+    rows = shares.sort_by([('Row', 'ascending'), ('Position', 'ascending')])
+    rows = rows.append_column('Slot', pa.array(range(len(rows)), pa.int64()))
+    signature = pc.binary_join_element_wise(rows['Syllables'], ' (', rows['Pronunciation'], ')', '')
+
+    # Similar words: join every syllable's signature to the top words for it, then
+    # collect them back per syllable slot in frequency order
+    matches = rows.select(['Slot', 'Word']).append_column('Signature', signature).join(similar, 'Signature')
+    matches = matches.filter(pc.not_equal(matches['Similar'], matches['Word'])).sort_by([('Rank', 'ascending')])
+    grouped = matches.group_by('Slot', use_threads=False).aggregate([('Similar', 'list')])
+    similar_words = pc.list_slice(grouped['Similar_list'], 0, max_similar)
+    similar_words = pc.take(similar_words, pc.index_in(rows['Slot'], value_set=grouped['Slot']))
+
+    # Compound relatives that are vocabulary words, in the treemap's order
+    relatives = [[r for _, r in compound_index.compound_relatives(w, compounds)] for w in selected['Word'].to_pylist()]
+    candidates = pa.array([r for rs in relatives for r in rs], pa.string())
+    known = set(candidates.filter(pc.is_in(candidates, value_set=words['Word'])).to_pylist())
+    relatives = pa.array([[r for r in rs if r in known][:max_similar] for rs in relatives], pa.list_(pa.string()))
+
+    word_rows = rows['Row']
+    parts = pc.take(selected['Compound'], word_rows)
+    compound = pc.if_else(pc.greater(pc.list_value_length(parts), 1), pc.binary_join(parts, ' + '),
+                          pa.scalar(None, pa.string()))
+    return pa.table({
+        'Word': rows['Word'],
+        'Compound': compound,
+        'Spelling Difficulty': pc.take(selected['Spelling Difficulty'], word_rows),
+        'Reading Difficulty': pc.take(selected['Reading Difficulty'], word_rows),
+        'Position': rows['Position'],
+        'Syllables': rows['Syllables'],
+        'Pronunciation': rows['Pronunciation'],
+        'Spelling Share': rows['Spelling Share'],
+        'Reading Share': rows['Reading Share'],
+        'Similar Words': similar_words,
+        'Compound Relatives': pc.take(relatives, word_rows),
+    })
+
+
+def iter_analyses(word_iter, chunk_size=5000, max_similar=10, sources=None, unmatched=None):
+    """Yields record batches for an arbitrarily long stream of words, `chunk_size` words at a time."""
+    words, counts, similar, compounds = sources or load_sources(max_similar=max_similar)
+    chunk = []
+    for word in word_iter:
+        chunk.append(word)
+        if len(chunk) == chunk_size:
+            yield from analyse_words(chunk, words, counts, similar, compounds, max_similar, unmatched).to_batches()
+            chunk = []
+    if chunk:
+        yield from analyse_words(chunk, words, counts, similar, compounds, max_similar, unmatched).to_batches()
+
+
+def export(word_iter, output, chunk_size=5000, max_similar=10):
+    """
+    Writes the analyses of `word_iter` to a Parquet file, one row group per chunk.
+    Returns the number of rows written and the input words that have none.
+    """
+    writer = None
+    n = 0
+    unmatched = []
+    for batch in iter_analyses(word_iter, chunk_size, max_similar, unmatched=unmatched):
+        if writer is None:
+            writer = pq.ParquetWriter(output, batch.schema)
+        writer.write_batch(batch)
+        n += batch.num_rows
+    if writer is not None:
+        writer.close()
+    return n, unmatched
+
+
+def read_word_list(filename):
+    with open(filename, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield line.strip()
+
+
+if __name__ == "__main__":
+    # python export.py words.txt analyses.parquet
+    if len(sys.argv) == 3:
+        rows, unmatched = export(read_word_list(sys.argv[1]), sys.argv[2])
+        print(f"Wrote {rows} syllable rows to {sys.argv[2]}; {len(unmatched)} words not found or not syllabified")
+        if unmatched: print(", ".join(unmatched[:20]) + (" ..." if len(unmatched) > 20 else ""))
+    else:
+        unmatched = []
+        print(analyse_words(["AACHEN", "ACCEPTABLE", "NOTAWORD"], *load_sources(), unmatched=unmatched).to_pandas().to_string())
+        print("Unmatched:", unmatched)
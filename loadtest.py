@@ -0,0 +1,263 @@
+"""
+Load generator for app.py: starts N local workers and drives them over Shiny's websocket
+protocol with a mix of Explore clicks and full Test Mode exams.
+
+    python loadtest.py --workers 2 --levels 1,5,10,20 --sessions 20
+    python loadtest.py startup --budget-ms 1000     (python -X importtime check of `import app`)
+
+Ngram requests are answered by a local stub so the network is never involved.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import urllib.request
+
+OUTPUTS = [
+    "results_container", "explore_result", "pie_plot", "relevance_plot", "treeplot", "similar_treemap",
+    "ngram_plot", "sound_results", "ui_step2_inputs", "ui_step3_action", "ui_step4_selection",
+    "game_container", "radar_plot",
+]
+
+
+def stub_fetch_ngram_data(query, start_year=1800, end_year=2019, corpus=26, smoothing=3):
+    rng = random.Random(query)
+    return [{'ngram': query, 'timeseries': [rng.random() * 1e-6 for _ in range(start_year, end_year + 1)]}]
+
+
+def serve(port, preload=False):
+    """Runs one app worker with the Ngram stub patched in before app.py imports it."""
+    import uvicorn
+    import ngram
+    ngram.fetch_ngram_data = stub_fetch_ngram_data
+    import app
+    if preload: app.warm_up()
+    uvicorn.run(app.app, host="127.0.0.1", port=port, log_level="warning", ws_max_size=64 * 1024 * 1024)
+
+
+def rss_mb(pid):
+    """Resident memory of a worker process in MB (Linux /proc)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def percentile(values, q):
+    if not values: return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def import_times(module="app"):
+    """
+    (total ms, [(name, cumulative ms), ...] of its direct imports) from `python -X importtime -c "import <module>"`.
+    importtime prints children before their parent, so the direct imports are the depth-1 lines
+    since the previous top-level line.
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True,
+                         text=True, cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stderr
+    children = []
+    for m in re.finditer(r"^import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)$", out, re.M):
+        depth, name, ms = len(m.group(2)) // 2, m.group(3), int(m.group(1)) / 1000
+        if depth == 1:
+            children.append((name, ms))
+        elif depth == 0:
+            if name == module: return ms, children
+            children = []
+    raise RuntimeError(f"{module} not found in importtime output")
+
+
+def check_startup(budget_ms, module="app", top=10):
+    """Prints the slowest direct imports of `module` and whether its total import time is within budget."""
+    total, children = import_times(module)
+    print(f"{'import':<28}{'cumulative ms':>14}")
+    for name, ms in sorted(children, key=lambda c: -c[1])[:top]:
+        print(f"{name:<28}{ms:>14.0f}")
+    print(f"import {module}: {total:.0f} ms (budget {budget_ms} ms)")
+    return total <= budget_ms
+
+
+# -----------------------------------------------------------------------------
+# SIMULATED SESSION
+# -----------------------------------------------------------------------------
+class Session:
+    def __init__(self, ws, latencies):
+        self.ws = ws
+        self.latencies = latencies
+        self.clicks = {}
+        self.last_values = {}
+
+    async def send(self, method, data):
+        await self.ws.send(json.dumps({"method": method, "data": data}))
+
+    async def wait_idle(self, timeout=120):
+        """Reads server messages until the flush that follows busy -> idle has delivered its values."""
+        busy = idle = False
+        while True:
+            msg = json.loads(await asyncio.wait_for(self.ws.recv(), timeout))
+            if isinstance(msg.get("values"), dict):
+                self.last_values.update(msg["values"])
+                if idle: return
+            if msg.get("busy") == "busy":
+                busy = True
+            elif msg.get("busy") == "idle" and busy:
+                idle = True
+
+    async def action(self, name, button, inputs=None):
+        """Sets `inputs`, clicks `button` and records the time until the server is idle again."""
+        self.clicks[button] = self.clicks.get(button, 0) + 1
+        data = dict(inputs or {})
+        data[f"{button}:shiny.action"] = self.clicks[button]
+        start = time.perf_counter()
+        await self.send("update", data)
+        await self.wait_idle()
+        self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+
+    def html(self, output):
+        value = self.last_values.get(output)
+        return json.dumps(value) if value is not None else ""
+
+
+async def explore(session, words):
+    word = random.choice(words)
+    mode = random.choice(["Spelling", "Pronunciation"])
+    await session.action("explore", "btn_explore", {"explore_word": word, "explore_mode": mode})
+
+
+async def exam(session, words):
+    await session.action("exam:init", "btn_step1", {"num_words": 1})
+    await session.action("exam:syllables", "btn_step2", {"word_input_0": random.choice(words)})
+    await session.action("exam:generate", "btn_generate_game", {"select_syl_0": ["0"]})
+
+    for _ in range(50):
+        board = session.html("game_container")
+        if "EXAMINATION COMPLETE" in board or "speakWord" not in board:
+            return
+        guesses = {}
+        for round_idx, i in re.findall(r"guess_(\d+)_(\d+)", board):
+            word = re.findall(r"speakWord\(\\*'([A-Z]+)\\*'\)", board)[int(i)]
+            # Roughly one in three guesses drops a letter
+            guess = word if random.random() > 0.33 or len(word) < 3 else word[:-2] + word[-1]
+            guesses[f"guess_{round_idx}_{i}"] = guess
+        await session.action("exam:submit", "btn_submit_round", guesses)
+        await session.action("exam:next", "btn_next_round")
+
+
+async def run_session(url, words, explore_ratio, actions, latencies, errors):
+    import websockets
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            session = Session(ws, latencies)
+            init = {f".clientdata_output_{name}_hidden": False for name in OUTPUTS}
+            init.update({"explore_word": "", "explore_mode": "Spelling", "num_words": 1, "exam_code": None, "sound_query": ""})
+            start = time.perf_counter()
+            await session.send("init", init)
+            await session.wait_idle()
+            latencies.setdefault("connect", []).append(time.perf_counter() - start)
+
+            for _ in range(actions):
+                if random.random() < explore_ratio:
+                    await explore(session, words)
+                else:
+                    await exam(session, words)
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+
+
+async def run_level(urls, words, concurrency, sessions, explore_ratio, actions):
+    """Runs `sessions` simulated learners, at most `concurrency` at a time, spread over the workers."""
+    latencies, errors = {}, []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with gate:
+            await run_session(urls[i % len(urls)], words, explore_ratio, actions, latencies, errors)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(sessions)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def start_workers(n, base_port, preload=False):
+    workers = []
+    for k in range(n):
+        port = base_port + k
+        proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve", "--port", str(port)]
+                                + (["--preload"] if preload else []),
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        workers.append((proc, port))
+    for proc, port in workers:
+        deadline = time.time() + 300
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2)
+                break
+            except OSError:
+                if proc.poll() is not None or time.time() > deadline:
+                    raise RuntimeError(f"worker on port {port} did not start")
+                time.sleep(0.5)
+    return workers
+
+
+def report(concurrency, elapsed, latencies, errors, workers):
+    n_actions = sum(len(v) for k, v in latencies.items() if k != "connect")
+    print(f"\n=== concurrency {concurrency}: {n_actions} actions in {elapsed:.1f}s "
+          f"({n_actions / elapsed:.2f} actions/s), {len(errors)} failed sessions")
+    print(f"{'action':<18}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in sorted(latencies):
+        values = [v * 1000 for v in latencies[name]]
+        print(f"{name:<18}{len(values):>6}{percentile(values, 50):>10.0f}{percentile(values, 95):>10.0f}{percentile(values, 99):>10.0f}")
+    print("worker RSS: " + ", ".join(f"{port}={rss_mb(proc.pid):.0f}MB" for proc, port in workers))
+    for e in errors[:3]:
+        print(f"  error: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "serve", "startup"])
+    parser.add_argument("--port", type=int, default=8800, help="first worker port")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--levels", default="1,5,10,20", help="concurrency levels to step through")
+    parser.add_argument("--sessions", type=int, default=20, help="simulated learners per level")
+    parser.add_argument("--actions", type=int, default=3, help="explore clicks or exams per learner")
+    parser.add_argument("--explore-ratio", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--preload", action="store_true", help="load all data before serving (app.warm_up)")
+    parser.add_argument("--budget-ms", type=float, default=1000, help="startup: import time budget for app.py")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.port, args.preload)
+        return
+    if args.command == "startup":
+        sys.exit(0 if check_startup(args.budget_ms) else 1)
+
+    import pandas as pd
+    random.seed(args.seed)
+    words = pd.read_parquet("lexarchDataProcessing/word_dataset_with_difficulties.parquet", columns=['Word'])['Word'].tolist()
+    workers = start_workers(args.workers, args.port, args.preload)
+    try:
+        urls = [f"ws://127.0.0.1:{port}/websocket/" for _, port in workers]
+        print("worker RSS at start: " + ", ".join(f"{port}={rss_mb(proc.pid):.0f}MB" for proc, port in workers))
+        for level in (int(x) for x in args.levels.split(",")):
+            elapsed, latencies, errors = asyncio.run(
+                run_level(urls, words, level, max(args.sessions, level), args.explore_ratio, args.actions))
+            report(level, elapsed, latencies, errors, workers)
+    finally:
+        for proc, _ in workers:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class GroupIndex:
+    """
+    Rows of a DataFrame grouped by `key`, each group sorted by `order` (largest first), with
+    {key: (start, stop)} offsets into that order. A lookup only builds an array of positions and
+    materialises the final rows with a single take, instead of filtering the full frame per key.
+    """
+
+    def __init__(self, df, key, order='Frequency', columns=()):
+        self.key = key
+        order_idx = np.lexsort((-df[order].to_numpy(), df[key].to_numpy()))
+        self.df = df
+        self.positions = order_idx
+        keys = df[key].to_numpy()[order_idx]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=int)
+        stops = np.r_[starts[1:], len(keys)]
+        self.groups = dict(zip(keys[starts], zip(starts, stops)))
+        self._columns = {}
+        for name in columns:
+            self.column(name)
+
+    def column(self, name):
+        """Cached NumPy view of a column, so per-request filters don't convert it again."""
+        if name not in self._columns:
+            self._columns[name] = self.df[name].to_numpy()
+        return self._columns[name]
+
+    def __contains__(self, value):
+        return value in self.groups
+
+    def rows(self, value):
+        """Positions (into the original frame) of every row with key == value, largest first."""
+        start, stop = self.groups.get(value, (0, 0))
+        return self.positions[start:stop]
+
+    def top(self, values, n=100, exclude=None):
+        """
+        The `n` largest rows for each key in `values`, concatenated in that order.
+        `exclude` = (column, value) drops matching rows before the top `n` are taken.
+        """
+        picked = []
+        for value in values:
+            pos = self.rows(value)
+            if exclude is not None:
+                pos = pos[self.column(exclude[0])[pos] != exclude[1]]
+            picked.append(pos[:n])
+        if not picked:
+            return self.df.iloc[:0]
+        return self.df.take(np.concatenate(picked))
+
+
+def row_lookup(df, key):
+    """{key value: position} for a column of unique values, e.g. words_df['Word']."""
+    return dict(zip(df[key].to_numpy(), range(len(df))))
+
@@ -1,8 +1,15 @@
 import urllib.parse
 import requests
+from ngram_store import fetch_local_ngram_data
 
 def fetch_ngram_data(query, start_year=1800, end_year=2019, corpus=26, smoothing=3):
-    """Fetches historical frequency data from Google Books Ngram Viewer."""
+    """Fetches historical frequency data from the local Ngram store if one was ingested, else Google Books Ngram Viewer."""
+    try:
+        local = fetch_local_ngram_data(query, start_year, end_year, smoothing)
+    except (OSError, ValueError):
+        local = None  # unreadable local store: use the network instead
+    if local is not None:
+        return local
     try:
         query_encoded = urllib.parse.quote(query)
         url = f'https://books.google.com/ngrams/json?content={query_encoded}&year_start={start_year}&year_end={end_year}&corpus={corpus}&smoothing={smoothing}'
@@ -0,0 +1,168 @@
+import gzip
+import os
+import sys
+import numpy as np
+
+STORE_DIR = "lexarchDataProcessing/ngram_store"
+START_YEAR = 1800
+END_YEAR = 2019
+N_YEARS = END_YEAR - START_YEAR + 1
+
+
+def _open(filename):
+    return gzip.open(filename, "rt", encoding="utf-8") if filename.endswith(".gz") else open(filename, encoding="utf-8")
+
+
+def normalize_token(token):
+    """
+    'Cat' -> 'CAT': the store is keyed like words_df, with case folded. POS-tagged tokens
+    ('cat_NOUN', '_NOUN_') give None: the untagged line already includes those occurrences.
+    """
+    if "_" in token: return None
+    return token.upper()
+
+
+def parse_line(line):
+    """
+    Parses one line of a Google Books 1-gram export into (token, years, match_counts).
+    Handles the 2020 format (`ngram TAB year,match,volumes TAB ...`) and the 2012 one
+    (`ngram TAB year TAB match TAB volumes`).
+    """
+    fields = line.rstrip("\n").split("\t")
+    if len(fields) == 4 and "," not in fields[1]:
+        return fields[0], np.array([int(fields[1])]), np.array([float(fields[2])])
+    entries = np.array([f.split(",")[:2] for f in fields[1:]], dtype=np.int64).reshape(-1, 2)
+    return fields[0], entries[:, 0], entries[:, 1].astype(np.float64)
+
+
+def read_total_counts(filename):
+    """Reads a totalcounts file (year,match,pages,volumes entries) into per-year match totals."""
+    totals = np.zeros(N_YEARS)
+    with _open(filename) as f:
+        for entry in f.read().split():
+            year, matches = entry.split(",")[:2]
+            year = int(year)
+            if START_YEAR <= year <= END_YEAR:
+                totals[year - START_YEAR] += float(matches)
+    return totals
+
+
+def ingest(shards, vocabulary, store_dir=STORE_DIR, total_counts=None):
+    """
+    Streams gzipped 1-gram shards into a (word, year) float32 array on disk, keeping only
+    tokens in `vocabulary`. With `total_counts` the store holds relative frequencies, like
+    the Ngram Viewer JSON; otherwise raw match counts.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    words = sorted({w.upper() for w in vocabulary})
+    index = {w: i for i, w in enumerate(words)}
+
+    # Written under temporary names and published with os.replace, words.txt last, so running
+    # workers keep their mapped copy and a half-written store is never picked up
+    tmp_series = os.path.join(store_dir, f"timeseries.{os.getpid()}.tmp.npy")
+    tmp_words = os.path.join(store_dir, f"words.{os.getpid()}.tmp.txt")
+    counts = np.lib.format.open_memmap(tmp_series, mode="w+", dtype=np.float32, shape=(len(words), N_YEARS))
+    for shard in shards:
+        with _open(shard) as f:
+            for line in f:
+                row = index.get(normalize_token(line.split("\t", 1)[0]))
+                if row is None: continue
+                _, years, matches = parse_line(line)
+                keep = (years >= START_YEAR) & (years <= END_YEAR)
+                np.add.at(counts[row], years[keep] - START_YEAR, matches[keep])
+
+    if total_counts is not None:
+        scale = np.where(total_counts > 0, total_counts, np.inf)
+        for start in range(0, len(words), 4096):
+            counts[start:start + 4096] /= scale
+    counts.flush()
+    del counts
+
+    with open(tmp_words, "w", encoding="utf-8") as f:
+        f.write("\n".join(words))
+    os.replace(tmp_series, os.path.join(store_dir, "timeseries.npy"))
+    os.replace(tmp_words, os.path.join(store_dir, "words.txt"))
+    _stores.pop(store_dir, None)
+    return len(words)
+
+
+_stores = {}
+
+
+def load_store(store_dir=STORE_DIR):
+    """
+    Returns ({word: row}, memory-mapped timeseries) or None if no complete store exists.
+    A store counts as present once words.txt is published; it is reloaded when words.txt
+    changes, and a store whose files don't match (mid re-ingest) is treated as missing.
+    """
+    words_path = os.path.join(store_dir, "words.txt")
+    try:
+        mtime = os.stat(words_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _stores.get(store_dir)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(words_path, encoding="utf-8") as f:
+        words = f.read().split("\n")
+    timeseries = np.load(os.path.join(store_dir, "timeseries.npy"), mmap_mode="r")
+    if timeseries.shape != (len(words), N_YEARS):
+        return None
+    _stores[store_dir] = mtime, ({w: i for i, w in enumerate(words)}, timeseries)
+    return _stores[store_dir][1]
+
+
+def smooth(series, smoothing):
+    """Centred moving average over +/- `smoothing` years, as the Ngram Viewer does."""
+    if smoothing <= 0:
+        return series
+    cumsum = np.concatenate(([0.0], np.cumsum(series, dtype=np.float64)))
+    idx = np.arange(len(series))
+    lo = np.maximum(idx - smoothing, 0)
+    hi = np.minimum(idx + smoothing + 1, len(series))
+    return (cumsum[hi] - cumsum[lo]) / (hi - lo)
+
+
+def fetch_local_ngram_data(query, start_year=1800, end_year=2019, smoothing=3, store_dir=STORE_DIR):
+    """
+    Same output as ngram.fetch_ngram_data, read from the local store.
+    Returns None when no store exists so callers can fall back to the network.
+    """
+    store = load_store(store_dir)
+    if store is None:
+        return None
+    index, timeseries = store
+    lo, hi = max(start_year, START_YEAR) - START_YEAR, min(end_year, END_YEAR) - START_YEAR + 1
+
+    results = []
+    for term in query.split(","):
+        row = index.get(normalize_token(term.strip()))
+        if row is None: continue
+        results.append({'ngram': term.strip(), 'timeseries': smooth(timeseries[row, lo:hi], smoothing).tolist()})
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        # python ngram_store.py totalcounts-1 1-00000-of-00024.gz 1-00001-of-00024.gz ...
+        import pandas as pd
+        vocabulary = pd.read_parquet("lexarchDataProcessing/final_dataset.parquet", columns=['Word'])['Word']
+        n = ingest(sys.argv[2:], vocabulary, total_counts=read_total_counts(sys.argv[1]))
+        print(f"Ingested {n} words into {STORE_DIR}")
+    else:
+        import tempfile
+        print("--- SYNTHETIC SHARD TEST ---")
+        tmp = tempfile.mkdtemp()
+        shard = os.path.join(tmp, "1-00000-of-00001.gz")
+        with gzip.open(shard, "wt", encoding="utf-8") as f:
+            f.write("cat\t1800,10,1\t1801,20,2\t2019,40,3\n")
+            f.write("Cat_NOUN\t1800,5,1\n")
+            f.write("zzyzx\t1900,1,1\n")
+        totals = os.path.join(tmp, "totalcounts-1")
+        with open(totals, "w") as f:
+            f.write(" 1800,100,1,1\t1801,100,1,1\t2019,200,1,1 ")
+        assert load_store(tmp) is None
+        ingest([shard], ["CAT", "DOG"], store_dir=tmp, total_counts=read_total_counts(totals))
+        for item in fetch_local_ngram_data("CAT,DOG,ZZYZX", smoothing=0, store_dir=tmp):
+            print(item['ngram'], item['timeseries'][:3], item['timeseries'][-1])
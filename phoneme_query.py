@@ -0,0 +1,155 @@
+import fnmatch
+import re
+
+import numpy as np
+import pandas as pd
+
+import explore_data
+
+VOWELS = {'AA', 'AE', 'AH', 'AO', 'AW', 'AY', 'EH', 'ER', 'EY', 'IH', 'IY', 'OW', 'OY', 'UH', 'UW'}
+
+
+def build_phoneme_index(parts_df):
+    """
+    Integer-encodes the parts database. Every row points at a unique signature, every signature
+    at a spelling and a pronunciation, and every pronunciation is stored as a byte string with
+    one byte per phoneme, so a pattern compiles to a bytes regex over a few thousand strings.
+    """
+    sig_codes, signatures = pd.factorize(parts_df['Signature'])
+    word_codes, words = pd.factorize(parts_df['Word'])
+    split = pd.Series(signatures).str.extract(r'^(.*) \((.*)\)$')
+    spell_codes, spellings = pd.factorize(split[0])
+    pron_codes, prons = pd.factorize(split[1])
+
+    phonemes = sorted({p for pron in prons for p in pron.split()})
+    phoneme_ids = {p: i for i, p in enumerate(phonemes)}
+    encoded = [bytes(phoneme_ids[p] for p in pron.split()) for pron in prons]
+    return {
+        'phonemes': phoneme_ids,
+        'encoded': encoded,
+        'pronunciations': np.asarray(prons, dtype=object),
+        'spellings': np.asarray(spellings, dtype=object),
+        'sig_pron': pron_codes,
+        'sig_spelling': spell_codes,
+        'row_sig': sig_codes,
+        'words': parts_df['Word'].to_numpy(),
+        'row_word': word_codes,
+        'n_words': len(words),
+        'frequency': parts_df['Frequency'].to_numpy(dtype=np.float64),
+    }
+
+
+index = build_phoneme_index(explore_data.parts_df)
+
+
+def compile_pattern(pattern, phonemes=None):
+    """
+    Phoneme pattern -> compiled bytes regex over encoded pronunciations.
+        AY           exactly the phoneme AY
+        ?            any one phoneme
+        *            any run of phonemes (possibly none)
+        <V> / <C>    any vowel / consonant
+        EY|AY        either phoneme
+    e.g. "K * <V> T" or "* AY *". Stress digits are ignored.
+    """
+    phonemes = phonemes or index['phonemes']
+
+    def char_class(names):
+        unknown = [n for n in names if n not in phonemes]
+        if unknown: raise ValueError(f"Unknown phoneme(s): {', '.join(unknown)}")
+        return b"[" + b"".join(re.escape(bytes([phonemes[n]])) for n in names) + b"]"
+
+    parts = []
+    for token in re.sub(r"\d", "", pattern.upper()).split():
+        if token == "*":
+            parts.append(b".*")
+        elif token == "?":
+            parts.append(b".")
+        elif token == "<V>":
+            parts.append(char_class(sorted(VOWELS & phonemes.keys())))
+        elif token == "<C>":
+            parts.append(char_class(sorted(phonemes.keys() - VOWELS)))
+        else:
+            parts.append(char_class(token.split("|")))
+    if not parts: raise ValueError("Empty phoneme pattern")
+    return re.compile(b"".join(parts), re.S)
+
+
+def _spelling_mask(spellings, patterns):
+    """Spellings matching any of the glob patterns (e.g. 'I', 'IGH', '*Y')."""
+    mask = np.zeros(len(spellings), dtype=bool)
+    for p in patterns:
+        rx = re.compile(fnmatch.translate(p.strip().upper()))
+        mask |= np.fromiter((rx.match(s) is not None for s in spellings), bool, len(spellings))
+    return mask
+
+
+def match_rows(pattern, spelling=None, exclude=None):
+    """
+    Positions of parts database rows whose syllable pronunciation matches `pattern`, optionally
+    only spellings matching `spelling` and never those matching `exclude` (lists of glob patterns).
+    """
+    rx = compile_pattern(pattern)
+    pron_mask = np.fromiter((rx.fullmatch(e) is not None for e in index['encoded']), bool, len(index['encoded']))
+    sig_mask = pron_mask[index['sig_pron']]
+    if spelling:
+        sig_mask &= _spelling_mask(index['spellings'], spelling)[index['sig_spelling']]
+    if exclude:
+        sig_mask &= ~_spelling_mask(index['spellings'], exclude)[index['sig_spelling']]
+    return np.flatnonzero(sig_mask[index['row_sig']])
+
+
+def query(pattern, spelling=None, exclude=None, examples=3):
+    """
+    How the syllables matching `pattern` are spelt, aggregated by spelling: number of distinct
+    words, frequency total, share of the total and the most frequent example words.
+    e.g. query("AY", exclude=["I"]) -> every spelling of the AY sound other than I.
+    """
+    rows = match_rows(pattern, spelling, exclude)
+    columns = ['Spelling', 'Pronunciations', 'Words', 'Frequency', 'Share', 'Examples']
+    if not len(rows): return pd.DataFrame(columns=columns)
+
+    sigs = index['row_sig'][rows]
+    spell = index['sig_spelling'][sigs]
+    freq = index['frequency'][rows]
+    n_spellings = len(index['spellings'])
+    counts = np.bincount(spell, minlength=n_spellings)
+    totals = np.bincount(spell, weights=freq, minlength=n_spellings)
+    found = np.flatnonzero(counts)
+    # A word with several matching syllables of one spelling counts once
+    word_pairs = np.unique(spell.astype(np.int64) * index['n_words'] + index['row_word'][rows])
+    word_counts = np.bincount(word_pairs // index['n_words'], minlength=n_spellings)
+
+    # Most frequent rows first, so the first `examples` of each spelling are its best examples
+    order = np.lexsort((-freq, spell))
+    starts = np.searchsorted(spell[order], found)
+    words = index['words'][rows[order]]
+    prons = index['pronunciations'][index['sig_pron'][sigs[order]]]
+
+    result = pd.DataFrame({
+        'Spelling': index['spellings'][found],
+        'Pronunciations': [", ".join(dict.fromkeys(prons[s:s + c])) for s, c in zip(starts, counts[found])],
+        'Words': word_counts[found],
+        'Frequency': totals[found].astype(np.int64),
+        'Share': totals[found] / totals.sum(),
+        'Examples': [", ".join(list(dict.fromkeys(words[s:s + c][:examples * 4]))[:examples])
+                     for s, c in zip(starts, counts[found])],
+    })
+    return result.sort_values('Frequency', ascending=False, ignore_index=True)[columns]
+
+
+def pattern_words(pattern, spelling=None, exclude=None, limit=50):
+    """The most frequent distinct words with a syllable matching the query, e.g. to seed an exam."""
+    rows = match_rows(pattern, spelling, exclude)
+    rows = rows[np.argsort(-index['frequency'][rows], kind='stable')]
+    return list(dict.fromkeys(index['words'][rows]))[:limit]
+
+
+if __name__ == "__main__":
+    import time
+    for pattern, kwargs in [("AY", {'exclude': ['I']}), ("K * <V> T", {}), ("* EY|AY", {'spelling': ['*IGH*', '*EI*']})]:
+        t = time.perf_counter()
+        res = query(pattern, **kwargs)
+        print(f"{pattern} {kwargs}: {len(res)} spellings ({(time.perf_counter() - t) * 1000:.1f} ms)")
+        print(res.head(5).to_string())
+    print(pattern_words("AY", exclude=["I"], limit=10))
@@ -1,10 +1,11 @@
 import requests
 import urllib.parse
-import matplotlib
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 
-
-matplotlib.use('Agg') 
-import matplotlib.pyplot as plt
+from ngram_store import fetch_local_ngram_data
 
 def runQuery(query, start_year=1800, end_year=2020, corpus=26, smoothing=3):
     """
@@ -37,35 +38,117 @@ def runQuery(query, start_year=1800, end_year=2020, corpus=26, smoothing=3):
             
     return return_data
 
-def plot_ngram_data(data, start_year, end_year):
+def _draw(ax, data, start_year, end_year):
+    years = list(range(start_year, end_year + 1))
+    ax.clear()
+    for name, timeseries in data:
+
+        limit = min(len(years), len(timeseries))
+        ax.plot(years[:limit], timeseries[:limit], label=name, linewidth=2)
+
+    ax.set_title("Google Ngram Viewer Analysis", fontsize=16)
+    ax.set_xlabel("Year", fontsize=12)
+    ax.set_ylabel("Frequency (%)", fontsize=12)
+    ax.legend()
+    ax.grid(True, linestyle='--', alpha=0.7)
+
+
+def chart_filename(data, start_year, end_year, fmt="png"):
+    """Content-addressed name: identical data and range always map to the same file."""
+    digest = hashlib.sha1(json.dumps([data, start_year, end_year], default=list).encode()).hexdigest()
+    return f"ngram_{digest[:16]}.{fmt}"
+
+
+def plot_ngram_data(data, start_year, end_year, output_filename=None, fmt="png"):
     """
     Plots the scraped Ngram data using Matplotlib and saves it to a file.
+    Returns the file name, which is content-addressed unless `output_filename` is given.
     """
     if not data:
         print("Nothing to plot.")
         return
 
+    # matplotlib is only imported once something is actually plotted
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
 
-    years = list(range(start_year, end_year + 1))
-    
-    plt.figure(figsize=(12, 6))
-    
-    for name, timeseries in data:
+    fig, ax = plt.subplots(figsize=(12, 6))
+    try:
+        _draw(ax, data, start_year, end_year)
+        fig.tight_layout()
+        output_filename = output_filename or chart_filename(data, start_year, end_year, fmt)
+        fig.savefig(output_filename)
+    finally:
+        plt.close(fig)
+    return output_filename
 
-        limit = min(len(years), len(timeseries))
-        plt.plot(years[:limit], timeseries[:limit], label=name, linewidth=2)
-
-    plt.title("Google Ngram Viewer Analysis", fontsize=16)
-    plt.xlabel("Year", fontsize=12)
-    plt.ylabel("Frequency (%)", fontsize=12)
-    plt.legend()
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    
 
-    output_filename = "ngram_chart.png"
-    plt.savefig(output_filename)
-    
+# -----------------------------------------------------------------------------
+# BATCH RENDERING
+# Each worker process keeps one Figure/Axes and redraws it for every query.
+# -----------------------------------------------------------------------------
+_worker_figure = None
+
+
+def _fetch(query, start_year, end_year):
+    local = fetch_local_ngram_data(query, start_year, end_year)
+    if local is not None:
+        return [(item['ngram'], item['timeseries']) for item in local]
+    return runQuery(query, start_year, end_year)
+
+
+def _render_one(job):
+    global _worker_figure
+    query, start_year, end_year, out_dir, fmt = job
+    data = _fetch(query, start_year, end_year)
+    if not data:
+        return query, None
+
+    path = os.path.join(out_dir, chart_filename(data, start_year, end_year, fmt))
+    if not os.path.exists(path):
+        if _worker_figure is None:
+            from matplotlib.figure import Figure
+            _worker_figure = Figure(figsize=(12, 6))
+            _worker_figure.add_subplot()
+        ax = _worker_figure.axes[0]
+        _draw(ax, data, start_year, end_year)
+        _worker_figure.tight_layout()
+        # Write then rename so concurrent workers never see a half-written chart
+        tmp = f"{path}.{os.getpid()}.tmp"
+        _worker_figure.savefig(tmp, format=fmt)
+        os.replace(tmp, path)
+    return query, os.path.basename(path)
+
+
+def render_batch(queries, start_year=1800, end_year=2019, out_dir="ngram_charts", fmt="png", processes=None):
+    """
+    Pre-renders a chart for every query across a process pool.
+    Charts already listed in out_dir/index.json for the same (query, range) are not fetched again.
+    Returns {query: file name}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    index_path = os.path.join(out_dir, "index.json")
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+
+    def key(query):
+        return f"{query}|{start_year}|{end_year}|{fmt}"
+
+    todo = [q for q in dict.fromkeys(queries)
+            if not (key(q) in index and os.path.exists(os.path.join(out_dir, index[key(q)])))]
+    jobs = [(q, start_year, end_year, out_dir, fmt) for q in todo]
+    if jobs:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for query, filename in pool.map(_render_one, jobs, chunksize=max(1, len(jobs) // 64)):
+                if filename: index[key(query)] = filename
+        with open(index_path, "w") as f:
+            json.dump(index, f)
+
+    return {q: index[key(q)] for q in queries if key(q) in index}
+
 
 if __name__ == "__main__":
 
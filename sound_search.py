@@ -0,0 +1,108 @@
+import heapq
+import math
+import pickle
+import re
+
+import explore_data
+
+
+def build_spelling_options(pronunciation_search, max_options=8):
+    """
+    Collapses pronunciation_search.pkl ({pron: {spelling: {word: freq, '_total': n}}}) into
+    {(pron, spelling): log P(spelling | pron)} and {pron: [(log P, spelling), ...]} holding
+    the `max_options` most likely spellings of each pronunciation.
+    """
+    log_probs, options = {}, {}
+    for pron, spellings in pronunciation_search.items():
+        totals = [(v['_total'], s) for s, v in spellings.items() if s != '_total' and v.get('_total')]
+        total = sum(t for t, _ in totals)
+        if not total: continue
+        for t, s in totals:
+            log_probs[(pron, s)] = math.log(t / total)
+        options[pron] = [(log_probs[(pron, s)], s) for t, s in heapq.nlargest(max_options, totals)]
+    return log_probs, options
+
+
+def load_spelling_options(filename="lexarchDataProcessing/pronunciation_search.pkl"):
+    """Reads pronunciation_search.pkl and keeps only its reduction; the per-word dicts are dropped."""
+    with open(filename, "rb") as f:
+        return build_spelling_options(pickle.load(f))
+
+
+spelling_log_probs, spelling_options = load_spelling_options()
+MAX_SYLLABLE_PHONEMES = max(len(p.split()) for p in spelling_options)
+
+words_df = explore_data.words_df
+vocabulary = set(words_df['Word'])
+# Exact whole-word pronunciations, e.g. "K AE T" -> [('CAT', ['K AE T'], ['CAT'])]
+words_by_sound = {}
+for word, pron, syls in zip(words_df['Word'], words_df['Pronunciation'], words_df['Syllables']):
+    words_by_sound.setdefault(" ".join(pron), []).append((word, list(pron), list(syls)))
+
+
+def word_log_prob(pronunciation, syllables):
+    """log P(spelling | pronunciation) of a known word, syllable by syllable."""
+    if len(pronunciation) != len(syllables): return -math.inf
+    return sum(spelling_log_probs.get(key, -math.inf) for key in zip(pronunciation, syllables))
+
+
+def parse_phonemes(text):
+    """
+    'ah | k aa | m ah' -> [['AH'], ['K', 'AA'], ['M', 'AH']] (syllables given),
+    'k ae t'           -> [['K', 'AE', 'T']] (one run, syllables are searched for).
+    Stress digits from CMU-style input are dropped.
+    """
+    runs = re.split(r"[|,/\-.]", re.sub(r"\d", "", text.upper()))
+    return [run.split() for run in runs if run.split()]
+
+
+def spell_from_sound(text, beam_width=50, max_results=10, min_ratio=1e-4):
+    """
+    Beam search over per-syllable spelling options for a phoneme sequence.
+    Hypotheses whose probability falls below `min_ratio` of the best one at the same position are
+    pruned, so long inputs stay fast. Returns [(spelling, probability, in vocabulary), ...],
+    vocabulary words first.
+    """
+    runs = parse_phonemes(text)
+    if not runs: return []
+    min_log = math.log(min_ratio)
+
+    candidates = {}
+    beams = [(0.0, "")]
+    for run in runs:
+        # states[i] holds the hypotheses that have consumed run[:i]
+        states = {0: beams}
+        for i in range(len(run)):
+            current = states.pop(i, None)
+            if not current: continue
+            current = heapq.nlargest(beam_width, current)
+            best = current[0][0]
+            current = [b for b in current if b[0] - best >= min_log]
+            for length in range(1, min(MAX_SYLLABLE_PHONEMES, len(run) - i) + 1):
+                options = spelling_options.get(" ".join(run[i:i + length]))
+                if not options: continue
+                nxt = states.setdefault(i + length, [])
+                for log_p, spelling in options:
+                    for score, prefix in current:
+                        nxt.append((score + log_p, prefix + spelling))
+        beams = heapq.nlargest(beam_width, states.get(len(run), []))
+        if not beams: break
+
+    for score, spelling in beams:
+        candidates[spelling] = max(score, candidates.get(spelling, -math.inf))
+
+    # Vocabulary words with exactly this sound are always offered, even if the beam dropped them
+    for word, pron, syls in words_by_sound.get(" ".join(" ".join(r) for r in runs), []):
+        candidates.setdefault(word, word_log_prob(pron, syls))
+
+    results = [(s, math.exp(score), s in vocabulary) for s, score in candidates.items()]
+    results.sort(key=lambda r: (not r[2], -r[1]))
+    return results[:max_results]
+
+
+if __name__ == "__main__":
+    import time
+    for test in ["K AE T", "AH | K AA | M AH | D EY T", "F OW | T AH | G R AE | F IH K"]:
+        t = time.perf_counter()
+        res = spell_from_sound(test)
+        print(f"{test}: {res[:5]} ({(time.perf_counter() - t) * 1000:.1f} ms)")
@@ -1,18 +1,35 @@
+import copy
+import functools
 import random
-import pandas as pd
+import numpy as np
+import compound_index
+import explore_data
 
-df = pd.read_parquet("lexarchDataProcessing/word_dataset_with_difficulties.parquet")
+df = explore_data.words_df
 minimum = 5/100
 maximum = 10/100
+EXAM_CACHE_SIZE = 256
 
-def similarly_hard(existing_words, confidence_metric, minimum, maximum):
-    difficulty_map = df.set_index('Word')['Spelling Difficulty'].to_dict()
-    
+# Precomputed once: column arrays and {syllable or pronunciation: rows of words containing it}
+difficulty_map = dict(zip(df['Word'], df['Spelling Difficulty']))
+words_arr = df['Word'].to_numpy()
+difficulty_arr = df['Spelling Difficulty'].to_numpy()
+syllables_arr = df['Syllables'].to_numpy()
+pronunciation_arr = df['Pronunciation'].to_numpy()
+
+def rows_containing(column):
+    exploded = df[column].reset_index(drop=True).explode()
+    rows = exploded.index.to_numpy()
+    return {part: np.unique(rows[idx]) for part, idx in exploded.groupby(exploded.to_numpy()).indices.items()}
+
+syllable_rows = rows_containing('Syllables')
+pronunciation_rows = rows_containing('Pronunciation')
+
+
+def similarly_hard(existing_words, confidence_metric, minimum, maximum, rng=None):
     # 1. Block existing words + current input words to avoid duplicated words
-    current_batch_keys = list(confidence_metric.keys())
-    temp_existing = set(existing_words)
-    temp_existing.update(current_batch_keys)
-    blocked_words = list(temp_existing) 
+    blocked_words = set(existing_words)
+    blocked_words.update(confidence_metric.keys())
     
     similarity_map = []
     
@@ -27,13 +44,25 @@ def similarly_hard(existing_words, confidence_metric, minimum, maximum):
     similar_sound = {}
     similar_spell = {}
     save = []
+
+    # Only rows sharing a target syllable or pronunciation can match, visited in dataset order
+    empty = np.zeros(0, dtype=np.int64)
+    candidates = np.unique(np.concatenate([empty] + [
+        rows for _, syl, pron in similarity_map
+        for rows in (syllable_rows.get(syl, empty), pronunciation_rows.get(pron, empty))
+    ]))
+    # With an rng, candidates are visited in a seeded order of their words instead of row order
+    if rng is not None:
+        candidates = candidates[np.argsort(words_arr[candidates], kind='stable')].tolist()
+        rng.shuffle(candidates)
   
-    for row_index, row in df.iterrows():
-        if row['Word'] in blocked_words: continue
+    for row_index in candidates:
+        word = words_arr[row_index]
+        if word in blocked_words: continue
             
-        current_diff = row['Spelling Difficulty']
-        current_syllables = row['Syllables']
-        current_pronunciation = row['Pronunciation']
+        current_diff = difficulty_arr[row_index]
+        current_syllables = syllables_arr[row_index]
+        current_pronunciation = pronunciation_arr[row_index]
 
         if len(current_syllables) != len(current_pronunciation): continue
 
@@ -45,12 +74,12 @@ def similarly_hard(existing_words, confidence_metric, minimum, maximum):
             
             if target_syl in current_syllables:
                 if (target_diff - minimum) <= current_diff <= (target_diff + maximum):
-                    similar_spell[row['Word']] = [target_syl]
-                    blocked_words.append(row['Word']) 
+                    similar_spell[word] = [target_syl]
+                    blocked_words.add(word) 
                     break # Stop checking this word against other targets
                 
                 elif current_diff < (target_diff - minimum - 0.1) or current_diff > (target_diff + maximum + 0.1):
-                    save.append([row['Word'], target_syl])
+                    save.append([word, target_syl])
 
             
             if target_pron in current_pronunciation:
@@ -60,9 +89,9 @@ def similarly_hard(existing_words, confidence_metric, minimum, maximum):
                     
                     if (target_diff - minimum) <= current_diff <= (target_diff + maximum):
                         if associated_syllable != target_syl:
-                            if row['Word'] not in blocked_words:
-                                similar_sound[row['Word']] = {associated_syllable, target_pron}
-                                blocked_words.append(row['Word'])
+                            if word not in blocked_words:
+                                similar_sound[word] = [associated_syllable]
+                                blocked_words.add(word)
 
     # Backup Logic in case no word was found that was within the original difficulty range
     if not similar_spell and not similar_sound and len(save) > 0:
@@ -72,61 +101,93 @@ def similarly_hard(existing_words, confidence_metric, minimum, maximum):
             if backup_word not in blocked_words:
                 backup_syl = save[i][1]
                 similar_spell[backup_word] = [backup_syl]
-                blocked_words.append(backup_word)
+                blocked_words.add(backup_word)
 
     input_keys = list(confidence_metric.keys())
     return similar_spell, similar_sound, input_keys, blocked_words
 
 
-def generate_test_words(tested_words, minimum, maximum):
+def similar_compounds(confidence_metric, blocked_words, minimum, maximum):
+    """
+    Words sharing a compound part with the tested words, within the same difficulty range, that
+    also contain one of the tested (syllable, pronunciation) pairs. They are labelled with that
+    syllable, so they count towards the syllable they actually test.
+    """
+    similar_compound = {}
+    empty = np.zeros(0, dtype=np.int64)
+    for word_key, word_dict in confidence_metric.items():
+        target_diff = difficulty_map.get(word_key, None)
+        if target_diff is None: continue
+
+        # {row: syllable} of words holding a tested pair at the same position
+        pair_rows = {}
+        for syl, pron in word_dict.items():
+            for row in np.intersect1d(syllable_rows.get(syl, empty), pronunciation_rows.get(pron, empty)):
+                if row in pair_rows: continue
+                if any(s == syl and p == pron for s, p in zip(syllables_arr[row], pronunciation_arr[row])):
+                    pair_rows[row] = syl
+        pair_words = {words_arr[row]: syl for row, syl in pair_rows.items()}
+
+        for _, relative in compound_index.compound_relatives(word_key):
+            if relative in blocked_words or relative in similar_compound: continue
+            if relative not in pair_words: continue
+            current_diff = difficulty_map.get(relative, None)
+            if current_diff is None: continue
+            if (target_diff - minimum) <= current_diff <= (target_diff + maximum):
+                similar_compound[relative] = [pair_words[relative]]
+    return similar_compound
+
+
+def generate_test_words(tested_words, minimum, maximum, seed=None):
+    rng = random.Random(seed) if seed is not None else None
     input_words = []
-    all_words = []
+    all_words = {} # insertion-ordered set
     saved_dicts = {}
     
-    existing_words = []
-    for batch in tested_words:
-        existing_words.extend(list(batch.keys()))
+    existing_words = {word for batch in tested_words for word in batch}
     
     for batch in tested_words:
-        res1, res2, res3, updated_existing = similarly_hard(existing_words, batch, minimum, maximum)
+        # Compound relatives are looked up first so spelling/sound matches cannot crowd them out
+        all_compounds = list(similar_compounds(batch, existing_words, minimum, maximum).items())
+        res1, res2, res3, updated_existing = similarly_hard(existing_words, batch, minimum, maximum, rng)
 
         
         TARGET_NEW_WORDS = 9 
         
-        all_spelling = list(res1.items())
-        all_sounds = list(res2.items())
+        final_compounds = all_compounds[:2]
+        compound_words = {w for w, _ in final_compounds}
+        all_spelling = [item for item in res1.items() if item[0] not in compound_words]
+        all_sounds = [item for item in res2.items() if item[0] not in compound_words]
         
-        # Take max 4 sounds
+        # Take max 4 sounds and 2 compound relatives
         final_sounds = all_sounds[:4]
         
         # Fill remainder with spelling matches
-        slots_taken = len(final_sounds)
+        slots_taken = len(final_sounds) + len(final_compounds)
         slots_needed = TARGET_NEW_WORDS - slots_taken
         final_spelling = all_spelling[:slots_needed]
         
         batch_generated = {}
         batch_generated.update(dict(final_spelling))
         batch_generated.update(dict(final_sounds))
+        batch_generated.update(dict(final_compounds))
+        updated_existing.update(compound_words)
 
         saved_dicts.update(batch_generated)
         input_words.append(res3)
-        all_words.extend(res3)
+        all_words.update(dict.fromkeys(res3))
 
         existing_words = updated_existing
 
-        
-
-    for i in saved_dicts.keys():
-        all_words.append(i)
-        
-    all_words = list(set(all_words))
+    all_words.update(dict.fromkeys(saved_dicts))
     
-    return saved_dicts, input_words, all_words
+    return saved_dicts, input_words, list(all_words)
 
-def organize_rounds(word_list):
-    """Splits a list of words into game rounds of 5."""
+def organize_rounds(word_list, seed=None):
+    """Splits a list of words into game rounds of 5, shuffled by `seed` (random if None)."""
     if not word_list: return []
-    random.shuffle(word_list)
+    word_list = list(word_list)
+    random.Random(seed).shuffle(word_list)
     n = len(word_list)
     if n < 5: return [word_list]
     
@@ -144,6 +205,28 @@ def organize_rounds(word_list):
     return rounds
 
 
+def exam_key(tested_words):
+    """Hashable form of tested_words, keeping batch and syllable order (both affect the result)."""
+    return tuple(tuple((word, tuple(syl_map.items())) for word, syl_map in batch.items()) for batch in tested_words)
+
+
+@functools.lru_cache(maxsize=EXAM_CACHE_SIZE)
+def _exam_template(key, minimum, maximum, seed):
+    tested_words = [{word: dict(syls) for word, syls in batch} for batch in key]
+    saved_dicts, _, all_words = generate_test_words(tested_words, minimum, maximum, seed)
+    return saved_dicts, organize_rounds(all_words, seed)
+
+
+def exam_template(tested_words, minimum, maximum, seed):
+    """
+    Generated words and rounds of the exam for (tested words, selected syllables, difficulty band, seed).
+    The same arguments always give the same exam; the last EXAM_CACHE_SIZE are kept, so a class
+    starting the same exam only generates it once. Returns copies the caller may modify.
+    """
+    saved_dicts, rounds = _exam_template(exam_key(tested_words), minimum, maximum, seed)
+    return copy.deepcopy(saved_dicts), [list(r) for r in rounds]
+
+
 if __name__ == "__main__":
     print("--- STARTING TEST ---")
 
@@ -156,10 +239,12 @@ if __name__ == "__main__":
     min_range = 0.05
     max_range = 0.10
 
-    df = df.sample(frac=1).reset_index(drop=True)
-    
     result = generate_test_words(tested_words, min_range, max_range)
     
     print("\n--- FINAL RESULT ---")
     print(f"Total Words: {len(result)}")
-    print(result)
\ No newline at end of file
+    print(result)
+
+    first = exam_template(tested_words, min_range, max_range, seed=7)
+    assert exam_template(tested_words, min_range, max_range, seed=7) == first
+    print(f"Seeded exam: {first[1]} {_exam_template.cache_info()}")
\ No newline at end of file
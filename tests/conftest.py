@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The modules load their data from paths relative to the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
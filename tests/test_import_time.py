@@ -0,0 +1,16 @@
+import loadtest
+
+# python -X importtime budget for `import app`: heavy modules and data must stay deferred
+BUDGET_MS = 1000
+
+
+def test_app_import_time():
+    total, children = loadtest.import_times("app")
+    slowest = sorted(children, key=lambda c: -c[1])[:5]
+    assert total <= BUDGET_MS, f"import app took {total:.0f} ms, slowest imports: {slowest}"
+
+
+def test_app_import_defers_data_modules():
+    _, children = loadtest.import_times("app")
+    deferred = {"plotly", "pandas", "shinywidgets", "explore_data", "spelling_bee_map", "sound_search"}
+    assert not deferred & {name for name, _ in children}
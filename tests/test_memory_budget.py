@@ -0,0 +1,43 @@
+import random
+import tracemalloc
+
+import pytest
+
+import explore_data
+import spelling_bee_map
+
+# Peak allocation allowed for one Explore / Test Mode request
+BUDGET_MB = 5
+
+random.seed(0)
+WORDS = random.sample(explore_data.ALL_WORDS, 50) + ["A", "THE", "ACCOMMODATE"]
+
+
+def peak_mb(fn, *args):
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(*args)
+        return (tracemalloc.get_traced_memory()[1] - base) / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("mode", ["Spelling", "Pronunciation"])
+def test_ambiguity_frame(mode):
+    peak = max(peak_mb(explore_data.ambiguity_frame, explore_data.word_row(w), mode) for w in WORDS)
+    assert peak < BUDGET_MB
+
+
+def test_similar_words_frame():
+    peak = max(peak_mb(explore_data.similar_words_frame, w, explore_data.word_row(w)) for w in WORDS)
+    assert peak < BUDGET_MB
+
+
+def test_generate_test_words():
+    def one(w):
+        data = explore_data.word_row(w)
+        tested = [{w: {data['Syllables'][0]: data['Pronunciation'][0]}}]
+        return peak_mb(spelling_bee_map.generate_test_words, tested, 0.05, 0.10)
+    assert max(one(w) for w in WORDS) < BUDGET_MB